@@ -1,37 +1,58 @@
+import importlib
+
 from flask import Flask
-from flask_cors import CORS
 from app.config import Config
-from app.extensions import db, api, limiter, jwt, bcrypt
+from app.extensions import db, api, limiter, jwt, bcrypt, cors, cache, OrjsonProvider
+
+# Flask-RESTX route modules; importing one registers its namespace on `api`
+NAMESPACE_MODULES = [
+    'app.routes.auth_restx',
+    'app.routes.reviews_restx',
+    'app.routes.agencies_restx',
+    'app.routes.external_restx',
+    'app.routes.offers_restx',
+    'app.routes.client_restx',
+]
+
+# (module, attribute, url_prefix) for plain Flask blueprints
+BLUEPRINTS = [
+    ('app.routes.home', 'home_bp', None),
+]
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
+    app.json = OrjsonProvider(app)
 
     # Initialize extensions
     db.init_app(app)
-    with app.app_context():
-        db.create_all()
-    
+
     jwt.init_app(app)
     bcrypt.init_app(app)
     limiter.init_app(app)
-    CORS(app)
+    cors.init_app(app)
+    cache.init_app(app)
     
     # Initialize API with Swagger at /swagger
     api.init_app(app)
 
-    # Register namespaced routes (Flask-RESTX)
-    from app.routes.auth_restx import auth_ns
-    from app.routes.reviews_restx import reviews_ns
-    from app.routes.agencies_restx import agencies_ns
-    from app.routes.external_restx import external_ns
-    from app.routes.offers_restx import offers_ns
-    from app.routes.client_restx import client_ns
-    
+    # Register namespaced routes (Flask-RESTX), imported once config is final.
     # Namespaces are auto-registered via api.namespace() calls in route files
-    
-    # Register legacy home blueprint
-    from app.routes.home import home_bp
-    app.register_blueprint(home_bp)
+    for module in NAMESPACE_MODULES:
+        importlib.import_module(module)
+
+    # Register legacy blueprints (home)
+    for module, attr, url_prefix in BLUEPRINTS:
+        blueprint = getattr(importlib.import_module(module), attr)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+    # CLI commands (flask refresh-trust)
+    from app.cli import refresh_trust_command
+    app.cli.add_command(refresh_trust_command)
+
+    # Create missing tables once every model is imported (AUTO_CREATE_TABLES)
+    if app.config.get('AUTO_CREATE_TABLES'):
+        with app.app_context():
+            db.create_all()
 
     return app
@@ -0,0 +1,25 @@
+"""
+Flask CLI commands, registered on the app in create_app():
+
+    flask --app wsgi refresh-trust
+"""
+import click
+from flask.cli import with_appcontext
+
+from app.extensions import db
+from app.services.trust_score_calculator import TrustScoreCalculator
+
+
+@click.command('refresh-trust')
+@with_appcontext
+def refresh_trust_command():
+    """
+    Recompute every stored agency trust score.
+
+    Writes through the ORM refresh agency_trust on flush; run this after
+    set-based updates (bulk approval, SQL imports) and periodically (e.g.
+    daily cron) so the 30-day recency factor decays.
+    """
+    count = TrustScoreCalculator.refresh_stored()
+    db.session.commit()
+    click.echo(f"✅ Refreshed trust scores for {count} agencies")
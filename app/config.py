@@ -5,13 +5,40 @@ class Config(object):
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'nexaway-jwt-secret-2025'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///nexaway.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLite PRAGMAs are applied per connection in extensions.py
+    SQLALCHEMY_ENGINE_OPTIONS = (
+        {'connect_args': {'check_same_thread': False}}
+        if SQLALCHEMY_DATABASE_URI.startswith('sqlite')
+        else {'pool_size': 20, 'max_overflow': 40, 'pool_recycle': 3600, 'pool_pre_ping': False}
+    )
     
     # Flask-RESTX Configuration
     RESTX_MASK_SWAGGER = False
     JSON_SORT_KEYS = False
 
+    # create_app() runs db.create_all() once models are loaded, only when enabled;
+    # deployed workers leave the schema to `python -m app.migrations`
+    AUTO_CREATE_TABLES = os.environ.get('AUTO_CREATE_TABLES', 'false').lower() == 'true'
+
+    # Rows per bulk insert when seeding from CSV (create_db.py)
+    SEED_BATCH_SIZE = int(os.environ.get('SEED_BATCH_SIZE', 10000))
+
+    # Reject oversized request bodies (413) before Werkzeug buffers them:
+    # 5MB license image plus room for the registration form fields
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 5 * 1024 * 1024 + 64 * 1024))
+
+    # bcrypt cost factor read by Flask-Bcrypt; lower it (e.g. 4) for local fixtures only
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+
+    # Flask-Caching for read-mostly agency endpoints; set CACHE_TYPE=RedisCache
+    # and CACHE_REDIS_URL to share entries across gunicorn workers
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'SimpleCache')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 60))
+
 class DevelopmentConfig(Config):
     DEBUG = True
+    AUTO_CREATE_TABLES = os.environ.get('AUTO_CREATE_TABLES', 'true').lower() == 'true'
 
 class ProductionConfig(Config):
     DEBUG = False
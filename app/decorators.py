@@ -1,11 +1,19 @@
 from functools import wraps
-from flask import jsonify
+from flask import g, jsonify
 from flask_jwt_extended import get_jwt
 
+
+def _claims():
+    """JWT claims for the current request, fetched once and kept on g"""
+    if 'jwt_claims' not in g:
+        g.jwt_claims = get_jwt()
+    return g.jwt_claims
+
+
 def admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        claims = get_jwt()
+        claims = _claims()
         if claims.get('role') != 'admin':
             return jsonify({"error": "Admin access required"}), 403
         return fn(*args, **kwargs)
@@ -15,7 +23,7 @@ def role_required(role):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            claims = get_jwt()
+            claims = _claims()
             if claims.get('role') != role or not isinstance(claims.get('sub'), str):
                 return jsonify({"msg": "Invalid token"}), 401
             return fn(*args, **kwargs)
@@ -25,7 +33,7 @@ def role_required(role):
 def client_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        claims = get_jwt()
+        claims = _claims()
         if claims.get('role') != 'client':
             return jsonify({"error": "Client access required"}), 403
         return fn(*args, **kwargs)
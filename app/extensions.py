@@ -1,10 +1,18 @@
+import sqlite3
+
+import orjson
+from flask import current_app, make_response
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_restx import Api
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
+from flask_caching import Cache
 from flask_cors import CORS
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 db = SQLAlchemy()
 api = Api(
@@ -15,7 +23,60 @@ api = Api(
     prefix='',
     ordered=True
 )
+
+
+@api.representation('application/json')
+def output_json(data, code, headers=None):
+    """Flask-RESTX JSON representation encoded with orjson (RESTX ignores app.json)"""
+    option = orjson.OPT_NON_STR_KEYS
+    if current_app.debug:
+        option |= orjson.OPT_INDENT_2
+    resp = make_response(orjson.dumps(data, option=option) + b'\n', code)
+    resp.headers.extend(headers or {})
+    return resp
+
+
 limiter = Limiter(key_func=get_remote_address)
 jwt = JWTManager()
 bcrypt = Bcrypt()
 cors = CORS()
+cache = Cache()
+
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL + relaxed fsync on every new SQLite connection (no-op elsewhere)"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA cache_size=-64000')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Keeps Flask's output conventions (sorted keys, HTTP dates, str() for
+    Decimal/UUID via DefaultJSONProvider.default) while encoding in C.
+    """
+
+    OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _encode(self, obj, indent=False):
+        option = self.OPTIONS | orjson.OPT_INDENT_2 if indent else self.OPTIONS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._encode(obj, indent='indent' in kwargs).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._encode(obj, indent) + b'\n', mimetype=self.mimetype)
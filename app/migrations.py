@@ -0,0 +1,532 @@
+"""
+Idempotent migrations for existing Nexaway databases.
+
+db.create_all() only creates missing tables - it never adds columns to tables
+that already exist. Run this after pulling model changes:
+
+    python -m app.migrations
+
+Pending steps from MIGRATIONS run inside ONE explicit transaction, so a run
+costs a single fsync on commit instead of one per ALTER/UPDATE statement.
+Applied step names are recorded in schema_migrations and skipped next time.
+"""
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+
+from app import create_app
+from app.extensions import db
+from app.services.trust_score_calculator import TrustScoreCalculator
+
+# Applied once per connection, before the transaction is opened
+# (journal_mode cannot change inside a transaction)
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=2147483648',
+    'PRAGMA busy_timeout=5000',
+)
+
+# (table, column, DDL type) - columns added after the first releases
+LEGACY_COLUMNS = (
+    ('agencies', 'agency_id', 'VARCHAR(20)'),
+    ('agencies', 'password_hash', 'VARCHAR(128)'),
+    ('pending_agencies', 'license_image_url', 'VARCHAR(255)'),
+    ('pending_agencies', 'password_hash', 'VARCHAR(128)'),
+    ('reviews', 'client_id', 'INTEGER REFERENCES users(id)'),
+    ('reviews', 'reply', 'TEXT'),
+    ('reviews', 'reply_at', 'DATETIME'),
+    ('reviews', 're_rating', 'INTEGER'),
+    ('reviews', 're_comment', 'TEXT'),
+    ('reviews', 'trust_bonus', 'INTEGER DEFAULT 0'),
+)
+
+
+def open_db(engine):
+    """Raw DBAPI connection with tuned PRAGMAs and an open write transaction"""
+    conn = engine.raw_connection()
+    cursor = conn.cursor()
+    if engine.dialect.name == 'sqlite':
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        # Take the write lock up front instead of upgrading mid-migration
+        cursor.execute('BEGIN IMMEDIATE')
+    return conn, cursor
+
+
+def table_columns(cursor, table):
+    """Set of column names currently present on a Postgres table"""
+    cursor.execute(
+        'SELECT column_name FROM information_schema.columns WHERE table_name = %s',
+        (table,)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def ensure_column(cursor, dialect, table, column, ddl):
+    """ALTER TABLE ... ADD COLUMN unless it already exists; True if added"""
+    if dialect == 'sqlite':
+        # Let SQLite reject duplicates rather than reading PRAGMA table_info first
+        try:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}')
+        except sqlite3.OperationalError as e:
+            # Missing tables are left to db.create_all()
+            if 'duplicate column' not in str(e) and 'no such table' not in str(e):
+                raise
+            return False
+        return True
+
+    # A failed statement aborts the whole Postgres transaction, so check first
+    columns = table_columns(cursor, table)
+    if not columns or column in columns:
+        return False
+    ddl = ddl.replace('DATETIME', 'TIMESTAMP')
+    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}')
+    return True
+
+
+def add_legacy_columns(cursor, dialect):
+    """Add any LEGACY_COLUMNS missing from older databases"""
+    added = [
+        f'{table}.{column}'
+        for table, column, ddl in LEGACY_COLUMNS
+        if ensure_column(cursor, dialect, table, column, ddl)
+    ]
+    return f"Added columns: {', '.join(added) or 'none'}"
+
+
+def backfill_review_client_ids(cursor, dialect):
+    """Link reviews left by registered clients to their user account"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_users_email_role ON users (email, role)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_reviews_customer_email ON reviews (customer_email)')
+
+    if dialect != 'sqlite' or sqlite3.sqlite_version_info >= (3, 33, 0):
+        # UPDATE ... FROM joins once instead of probing users per review row
+        cursor.execute("""
+            UPDATE reviews SET client_id = u.id
+            FROM users u
+            WHERE u.email = reviews.customer_email
+              AND u.role = 'client'
+              AND reviews.client_id IS NULL
+        """)
+    else:
+        cursor.execute("""
+            UPDATE reviews SET client_id = (
+                SELECT u.id FROM users u
+                WHERE u.email = reviews.customer_email AND u.role = 'client'
+            )
+            WHERE client_id IS NULL
+        """)
+    return f"Linked {max(cursor.rowcount, 0)} reviews to client accounts"
+
+
+def assign_agency_ids(cursor, dialect):
+    """Give approved agencies their public A-xxx id in one set-based UPDATE"""
+    if dialect == 'sqlite':
+        label = "printf('A-%03d', id)"
+    else:
+        label = "'A-' || lpad(id::text, greatest(length(id::text), 3), '0')"
+    cursor.execute(
+        f"UPDATE agencies SET agency_id = {label} "
+        "WHERE status = 'approved' AND agency_id IS NULL"
+    )
+    return f"Assigned agency_id to {max(cursor.rowcount, 0)} approved agencies"
+
+
+def normalize_tax_ids(cursor, dialect):
+    """Strip dashes and uppercase RNE tax ids in place, with their references"""
+    if dialect != 'sqlite':
+        # Postgres enforces the tax_id foreign keys immediately, so a
+        # parent/child rename needs ON UPDATE CASCADE - left to a DBA there
+        return "Skipped (SQLite only)"
+
+    norm = "UPPER(REPLACE({0}, '-', ''))"
+    # Only rows that change, and never onto an id another agency already has
+    dirty = (
+        f"SELECT tax_id FROM agencies a WHERE tax_id != {norm.format('tax_id')} "
+        f"AND NOT EXISTS (SELECT 1 FROM agencies b WHERE b.tax_id = {norm.format('a.tax_id')})"
+    )
+    for table, column in (('offers', 'agency_id'), ('users', 'agency_id'),
+                          ('pending_agencies', 'agency_tax_id')):
+        cursor.execute(
+            f"UPDATE {table} SET {column} = {norm.format(column)} "
+            f"WHERE {column} IN ({dirty})"
+        )
+    cursor.execute(f"UPDATE agencies SET tax_id = {norm.format('tax_id')} WHERE tax_id IN ({dirty})")
+    return f"Normalized {max(cursor.rowcount, 0)} agency tax ids"
+
+
+# Tables the --check report inspects; names are interpolated into PRAGMAs
+CHECK_TABLES = ('agencies', 'pending_agencies', 'reviews', 'users')
+
+ORPHAN_CHECKS = (
+    ('offers without agency',
+     'SELECT COUNT(*) FROM offers o WHERE NOT EXISTS '
+     '(SELECT 1 FROM agencies a WHERE a.tax_id = o.agency_id)'),
+    ('reviews without agency',
+     'SELECT COUNT(*) FROM reviews r WHERE NOT EXISTS '
+     '(SELECT 1 FROM agencies a WHERE a.agency_id = r.agency_id)'),
+    ('approved agencies without agency_id',
+     "SELECT COUNT(*) FROM agencies WHERE status = 'approved' AND agency_id IS NULL"),
+)
+
+
+def check_db(engine):
+    """Read-only report of schema drift and pending migrations"""
+    dialect = engine.dialect.name
+    if dialect == 'sqlite':
+        # One read-only connection for every check
+        conn = sqlite3.connect(f'file:{engine.url.database}?mode=ro', uri=True)
+        conn.execute('PRAGMA query_only = 1')
+    else:
+        conn = engine.raw_connection()
+    cursor = conn.cursor()
+
+    try:
+        expected = {}
+        for table, column, _ in LEGACY_COLUMNS:
+            expected.setdefault(table, []).append(column)
+        for table in CHECK_TABLES:
+            if dialect == 'sqlite':
+                cursor.execute(f'PRAGMA table_info({table})')
+                columns = {row[1] for row in cursor.fetchall()}
+            else:
+                columns = table_columns(cursor, table)
+            missing = [c for c in expected.get(table, []) if c not in columns]
+            print(f"{table}: {len(columns)} columns"
+                  + (f", missing {', '.join(missing)}" if missing else ""))
+
+        try:
+            cursor.execute('SELECT name FROM schema_migrations')
+            done = {row[0] for row in cursor.fetchall()}
+        except Exception:
+            conn.rollback()
+            done = set()
+        pending = [name for name, _ in MIGRATIONS if name not in done]
+        print(f"Pending migrations: {', '.join(pending) or 'none'}")
+
+        for label, sql in ORPHAN_CHECKS:
+            cursor.execute(sql)
+            print(f"{label}: {cursor.fetchone()[0]}")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def convert_offer_tags_to_json(cursor, dialect):
+    """Offer.tags moved from a JSON string in TEXT to a native JSON column"""
+    if dialect != 'postgresql':
+        # SQLite stores JSON as text already; the existing values parse as-is
+        return "Nothing to do"
+    # db.create_all() already makes a fresh database's column JSON, and
+    # json has no equality operator for NULLIF - a failure here would abort
+    # the whole migration transaction
+    cursor.execute(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name = 'offers' AND column_name = 'tags'"
+    )
+    row = cursor.fetchone()
+    if not row or row[0] not in ('text', 'character varying'):
+        return "Nothing to do"
+    cursor.execute(
+        "ALTER TABLE offers ALTER COLUMN tags TYPE JSON USING NULLIF(tags, '')::json"
+    )
+    return "Converted offers.tags to JSON"
+
+
+def create_offer_indexes(cursor, dialect):
+    """Composite indexes declared in Offer.__table_args__"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_offers_type_route_date '
+                   'ON offers (type, from_city, to_city, date_from)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_offers_agency_type_price '
+                   'ON offers (agency_id, type, price)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_offers_active '
+                   'ON offers (type, date_from) WHERE seats_available > 0')
+    return "Created offer search indexes"
+
+
+# (table, constraint, CHECK expression) - declared on the models
+RANGE_CHECKS = (
+    ('reviews', 'ck_reviews_rating', 'rating BETWEEN 1 AND 5'),
+    ('reviews', 'ck_reviews_re_rating', 're_rating BETWEEN 1 AND 5'),
+    ('agencies', 'ck_agencies_category', "category IN ('A', 'B', 'C')"),
+)
+
+
+def add_range_checks(cursor, dialect):
+    """Narrow review ratings to SMALLINT and add the model CHECK constraints"""
+    if dialect != 'postgresql':
+        # SQLite can only add CHECKs by rebuilding the table; new DBs get them
+        return "Skipped (declared on new SQLite tables only)"
+    cursor.execute('ALTER TABLE reviews ALTER COLUMN rating TYPE SMALLINT')
+    cursor.execute('ALTER TABLE reviews ALTER COLUMN re_rating TYPE SMALLINT')
+
+    added, invalid = [], []
+    for table, name, check in RANGE_CHECKS:
+        # db.create_all() already declared them on fresh databases
+        cursor.execute('SELECT 1 FROM pg_constraint WHERE conname = %s', (name,))
+        if cursor.fetchone():
+            continue
+        # NOT VALID only checks new writes, so legacy rows cannot fail the run
+        cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({check}) NOT VALID')
+        added.append(name)
+        cursor.execute(f'SELECT COUNT(*) FROM {table} WHERE NOT ({check})')
+        bad_rows = cursor.fetchone()[0]
+        if bad_rows:
+            invalid.append(f'{name} ({bad_rows} rows violate it; fix them, then '
+                           f'ALTER TABLE {table} VALIDATE CONSTRAINT {name})')
+        else:
+            cursor.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}')
+
+    message = f"Added constraints: {', '.join(added) or 'none'}"
+    if invalid:
+        message += f"; left NOT VALID: {'; '.join(invalid)}"
+    return message
+
+
+def create_pending_agency_index(cursor, dialect):
+    """Composite index declared in PendingAgency.__table_args__"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_pending_agencies_status_created '
+                   'ON pending_agencies (status, created_at)')
+    return "Created pending agencies queue index"
+
+
+def repair_offer_tags(cursor, dialect):
+    """Make every SQLite offers.tags value parseable by the JSON column type"""
+    if dialect != 'sqlite':
+        # Postgres validated the values in 0005_offer_tags_json
+        return "Nothing to do"
+    try:
+        cursor.execute("UPDATE offers SET tags = NULL WHERE trim(tags) = ''")
+        blank = cursor.rowcount
+        # Legacy free-text tags become a one-element array
+        cursor.execute("UPDATE offers SET tags = json_array(tags) "
+                       "WHERE tags IS NOT NULL AND NOT json_valid(tags)")
+    except sqlite3.OperationalError as exc:
+        if 'no such table' in str(exc):
+            return "Skipped (no offers table)"
+        raise
+    return f"Cleared {blank} blank and wrapped {cursor.rowcount} legacy tag values"
+
+
+def create_status_indexes(cursor, dialect):
+    """Composite indexes declared on Agency and Review __table_args__"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_agencies_status_created '
+                   'ON agencies (status, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_reviews_agency_status_created '
+                   'ON reviews (agency_id, status, created_at)')
+    return "Created agency/review status indexes"
+
+
+TIMESTAMP_DEFAULTS = (
+    ('agencies', 'created_at'), ('agencies', 'updated_at'),
+    ('offers', 'created_at'),
+    ('reviews', 'created_at'), ('reviews', 'updated_at'),
+    ('agency_trust', 'updated_at'),
+    ('pending_agencies', 'created_at'), ('pending_agencies', 'updated_at'),
+)
+
+
+def add_timestamp_defaults(cursor, dialect):
+    """DB-side now() defaults for rows inserted outside the ORM"""
+    if dialect != 'postgresql':
+        # SQLite cannot change a column default in place; new DBs get them
+        return "Skipped (declared on new SQLite tables only)"
+    for table, column in TIMESTAMP_DEFAULTS:
+        cursor.execute(f'ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT now()')
+    return f"Set now() default on {len(TIMESTAMP_DEFAULTS)} timestamp columns"
+
+
+def create_governorate_index(cursor, dialect):
+    """Expression index declared in Agency.__table_args__"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_agencies_governorate_lower '
+                   'ON agencies (lower(governorate))')
+    return "Created lower(governorate) index"
+
+
+def create_client_review_indexes(cursor, dialect):
+    """Composite indexes for the client "my reviews" page (Review.__table_args__)"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_reviews_client_created '
+                   'ON reviews (client_id, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_reviews_email_created '
+                   'ON reviews (customer_email, created_at)')
+    return "Created client review indexes"
+
+
+# (table, column, DDL type) - stored TrustScoreCalculator results
+TRUST_RESULT_COLUMNS = (
+    ('agency_trust', 'rules_score', 'INTEGER'),
+    ('agency_trust', 'reviews_count', 'INTEGER'),
+    ('agency_trust', 'evaluation_reasons', 'JSON'),
+)
+
+
+def add_trust_result_columns(cursor, dialect):
+    """Columns for calculator scores stored on agency_trust (filled on next write or refresh)"""
+    added = [
+        f'{table}.{column}'
+        for table, column, ddl in TRUST_RESULT_COLUMNS
+        if ensure_column(cursor, dialect, table, column, ddl)
+    ]
+    return f"Added columns: {', '.join(added) or 'none'}"
+
+
+def replace_status_indexes(cursor, dialect):
+    """
+    Covering (status, rating) index on reviews; drop single-column status
+    indexes that a composite with a status prefix already serves
+    """
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_reviews_status_rating '
+                   'ON reviews (status, rating)')
+    for index in ('ix_reviews_status', 'ix_agencies_status', 'ix_pending_agencies_status'):
+        cursor.execute(f'DROP INDEX IF EXISTS {index}')
+    return "Created ix_reviews_status_rating, dropped redundant status indexes"
+
+
+def drop_redundant_review_indexes(cursor, dialect):
+    """Single-column reviews indexes that a composite with the same prefix serves"""
+    # agency_id -> ix_reviews_agency_status_created, client_id ->
+    # ix_reviews_client_created, customer_email (0002) -> ix_reviews_email_created
+    indexes = ('ix_reviews_agency_id', 'ix_reviews_client_id', 'ix_reviews_customer_email')
+    for index in indexes:
+        cursor.execute(f'DROP INDEX IF EXISTS {index}')
+    return f"Dropped {', '.join(indexes)}"
+
+
+def create_pending_tax_id_unique_index(cursor, dialect):
+    """Partial unique index declared in PendingAgency.__table_args__"""
+    # Older duplicates raced past the register_agency pre-check; keep the
+    # first pending row per RNE and reject the rest so the index can build
+    cursor.execute(
+        "UPDATE pending_agencies SET status = 'rejected' "
+        "WHERE status = 'pending' AND id NOT IN ("
+        "SELECT min(id) FROM pending_agencies WHERE status = 'pending' GROUP BY agency_tax_id)"
+    )
+    rejected = cursor.rowcount
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_pending_agencies_tax_id_pending '
+                   "ON pending_agencies (agency_tax_id) WHERE status = 'pending'")
+    return f"Created ux_pending_agencies_tax_id_pending, rejected {rejected} duplicate pending rows"
+
+
+def backup_db(engine):
+    """Snapshot a SQLite database with VACUUM INTO before migrating it"""
+    if engine.dialect.name != 'sqlite' or not engine.url.database:
+        print("[!] Backups are only supported for file-based SQLite databases")
+        return None
+
+    stamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    root, ext = os.path.splitext(engine.url.database)
+    backup_path = f"{root}_backup_{stamp}{ext or '.db'}"
+
+    # Page-level copy done by SQLite itself - rows never pass through Python
+    conn = sqlite3.connect(engine.url.database)
+    try:
+        conn.execute('VACUUM INTO ?', (backup_path,))
+    finally:
+        conn.close()
+    return backup_path
+
+
+def finalize(conn, dialect):
+    """Refresh planner statistics for the new schema, then close"""
+    try:
+        if dialect == 'sqlite':
+            # 0x10000 bounds ANALYZE runtime on large tables
+            conn.cursor().execute('PRAGMA optimize(0x10012)')
+    finally:
+        conn.close()
+
+
+# Applied in order, each at most once; append new steps at the end
+MIGRATIONS = (
+    ('0001_legacy_columns', add_legacy_columns),
+    ('0002_review_client_ids', backfill_review_client_ids),
+    ('0003_agency_ids', assign_agency_ids),
+    ('0004_normalize_tax_ids', normalize_tax_ids),
+    ('0005_offer_tags_json', convert_offer_tags_to_json),
+    ('0006_offer_indexes', create_offer_indexes),
+    ('0007_range_checks', add_range_checks),
+    ('0008_pending_agency_index', create_pending_agency_index),
+    ('0009_offer_tags_repair', repair_offer_tags),
+    ('0010_status_indexes', create_status_indexes),
+    ('0011_timestamp_defaults', add_timestamp_defaults),
+    ('0012_governorate_index', create_governorate_index),
+    ('0013_client_review_indexes', create_client_review_indexes),
+    ('0014_trust_result_columns', add_trust_result_columns),
+    ('0015_status_indexes_covering', replace_status_indexes),
+    ('0016_review_fk_indexes', drop_redundant_review_indexes),
+    ('0017_pending_tax_id_unique', create_pending_tax_id_unique_index),
+)
+
+
+def applied_migrations(cursor, dialect):
+    """Create the bookkeeping table if needed and return applied names"""
+    # Pure name lookup: on SQLite, skip the separate rowid b-tree
+    suffix = ' WITHOUT ROWID' if dialect == 'sqlite' else ''
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name VARCHAR(100) PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ){suffix}
+    """)
+    cursor.execute('SELECT name FROM schema_migrations')
+    return {row[0] for row in cursor.fetchall()}
+
+
+def run_migrations(engine):
+    """Apply every pending migration on one connection, in one transaction"""
+    dialect = engine.dialect.name
+    placeholder = '?' if dialect == 'sqlite' else '%s'
+    results = []
+
+    conn, cursor = open_db(engine)
+    try:
+        done = applied_migrations(cursor, dialect)
+        for name, migration in MIGRATIONS:
+            if name in done:
+                continue
+            results.append((name, migration(cursor, dialect)))
+            cursor.execute(
+                f'INSERT INTO schema_migrations (name) VALUES ({placeholder})',
+                (name,)
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        finalize(conn, dialect)
+
+    for name, message in results:
+        print(f"✅ {name}: {message}")
+    print(f"✅ Migrations complete ({len(results)} applied)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply Nexaway schema migrations')
+    parser.add_argument('--backup', action='store_true',
+                        help='snapshot the SQLite database before migrating')
+    parser.add_argument('--check', action='store_true',
+                        help='report schema drift without changing anything')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.check:
+            check_db(db.engine)
+            raise SystemExit(0)
+        if args.backup:
+            backup_path = backup_db(db.engine)
+            if backup_path:
+                print(f"✅ Backup written to {backup_path}")
+        # New tables come from the models; existing ones are patched below
+        db.create_all()
+        run_migrations(db.engine)
+        # Backfill agency_trust for rows written outside the ORM flush hook
+        # (seed/bulk SQL, databases older than the table)
+        count = TrustScoreCalculator.refresh_stored()
+        db.session.commit()
+        print(f"✅ Refreshed stored trust scores for {count} agencies")
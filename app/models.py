@@ -1,13 +1,131 @@
 # -*- coding: utf-8 -*-
-from .extensions import db
-from datetime import datetime
+from .extensions import db, bcrypt
+import time
+from collections import OrderedDict
+from functools import cached_property
+from datetime import datetime, timedelta
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy import func, CheckConstraint
+from sqlalchemy import and_, case, event, func, text, CheckConstraint
+
+def _iso(attr):
+    return f'self.{attr}.isoformat() if self.{attr} else None'
+
+
+def _build_to_dict(spec, doc='JSON serialization'):
+    """
+    Compile a to_dict method returning one dict literal.
+
+    spec is a sequence of (key, expression) pairs in output order; the
+    generated body does the attribute loads inline instead of looping.
+    """
+    items = ''.join(f'        {key!r}: {expr},\n' for key, expr in spec)
+    namespace = {}
+    exec(f'def to_dict(self):\n    return {{\n{items}    }}\n', namespace)
+    to_dict = namespace['to_dict']
+    to_dict.__doc__ = doc
+    return to_dict
+
+
+# (total, recent, rating_sum, replied_fast) for an agency without reviews
+_NO_REVIEWS = (0, 0, 0, 0)
+
+# Per-process trust_score LRU: {agency_id: (reviews_version, status, expires_at, score)}.
+# Review writes bump the agency's version; the TTL bounds staleness from
+# writes that bypass the ORM (bulk updates, other workers).
+TRUST_CACHE_TTL = 300
+TRUST_CACHE_MAXSIZE = 10000
+_TRUST_CACHE = OrderedDict()
+_REVIEW_VERSIONS = {}
+
+
+def weighted_trust_score(status, total, recent, rating_sum, replied_fast, rejected=0):
+    """
+    Agency trust score from approved-review aggregates, weighted factors:
+    - recency (0.3): Recent reviews weighted more
+    - volume (0.2): Review count (capped at 100)
+    - avg_rating (0.25): Average rating (1-5 normalized)
+    - reply_rate (0.15): % of reviews with <24h replies
+    - spam_reject (0.1): % of non-spam reviews
+    - verified (0.05): Bonus for approved status (1.1x vs 0.9x)
+
+    Returns: Score on 0-100 scale
+    """
+    if total > 0:
+        recency = min(recent / total * 1.2, 1.0)
+        avg_rating_normalized = (rating_sum / total - 1) / 4  # Convert 1-5 to 0-1
+        reply_rate = replied_fast / total
+        spam_reject = 1 - (rejected / total)
+    else:
+        # Neutral values if no reviews
+        recency = 0.5
+        avg_rating_normalized = 0.6
+        reply_rate = 0.5
+        spam_reject = 1.0
+
+    volume = min(total / 100, 1.0)
+    verified_multiplier = 1.1 if status == 'approved' else 0.9
+
+    # Calculate weighted score (0-1 scale)
+    weighted_score = (
+        recency * 0.3 +
+        volume * 0.2 +
+        avg_rating_normalized * 0.25 +
+        reply_rate * 0.15 +
+        spam_reject * 0.1
+    ) * verified_multiplier
+
+    # Convert to 0-100 scale, round to 1 decimal
+    final_score = round(weighted_score * 100, 1)
+
+    return min(100, max(0, final_score))
+
+
+# Agency.to_dict keys copied straight from attributes, in output order
+_AGENCY_DICT_FIELDS = (
+    'id', 'tax_id', 'company_name', 'official_name', 'category', 'email',
+    'phone', 'address', 'governorate', 'website', 'sectors', 'tourism_license',
+    'registry_number', 'verification_status', 'trust_score', 'status', 'source',
+)
+
+_AGENCY_TO_DICT = [(f, f'self.{f}') for f in _AGENCY_DICT_FIELDS] + [
+    ('created_at', _iso('created_at')),
+    ('updated_at', _iso('updated_at')),
+]
+
+_OFFER_TO_DICT = [
+    ('offer_id', 'self.offer_id'),
+    ('agency_tax_id', 'self.agency_id'),  # Keep for compatibility
+    ('agency_name', 'self.agency.company_name if self.agency else None'),
+    ('type', 'self.type'),
+    ('title', 'self.title'),
+    ('price', 'self.price'),
+    ('currency', 'self.currency'),
+    ('from_city', 'self.from_city'),
+    ('to_city', 'self.to_city'),
+    ('date_from', _iso('date_from')),
+    ('date_to', _iso('date_to')),
+    ('seats_available', 'self.seats_available'),
+    ('description', 'self.description'),
+    ('created_at', _iso('created_at')),
+    ('segment', 'self.segment'),
+    ('pilgrimage_type', 'self.pilgrimage_type'),
+    ('domestic', 'self.domestic'),
+    ('capacity', 'self.capacity'),
+    ('tags', 'self.tags or []'),
+]
+
 
 class Agency(db.Model):
     """Tunisian Travel Agency Model - Matches CSV exactly"""
 
     __tablename__ = 'agencies'
+    __table_args__ = (
+        CheckConstraint("category IN ('A', 'B', 'C')", name='ck_agencies_category'),
+        # Status-filtered listings, newest first
+        db.Index('ix_agencies_status_created', 'status', 'created_at'),
+        # Case-insensitive governorate filter
+        db.Index('ix_agencies_governorate_lower', func.lower(db.text('governorate'))),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     agency_id = db.Column(db.String(20), unique=True, index=True)  # A-xxx for approved agencies
@@ -28,39 +146,27 @@ class Agency(db.Model):
 
     # Nexaway Features
     verification_status = db.Column(db.String(20), default='pending', index=True)
-    status = db.Column(db.String(20), default='pending', index=True)  # pending, approved
+    status = db.Column(db.String(20), default='pending')  # pending, approved (indexed via ix_agencies_status_created)
     source = db.Column(db.String(20), default='csv')
 
     # Password for claiming approved agencies
     password_hash = db.Column(db.String(128))
 
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=func.now())
+
+    # Materialized trust score (see AgencyTrust); the flush hook
+    # creates a row for any written agency, so deleting the agency removes it
+    trust_row = db.relationship('AgencyTrust', uselist=False, lazy='joined',
+                                cascade='all, delete-orphan')
+    # Collections load on access only; list endpoints never read them
+    offers = db.relationship('Offer', back_populates='agency', lazy='select')
+    reviews = db.relationship('Review', back_populates='agency', lazy='select')
     
-    def to_dict(self):
-        """JSON serialization"""
-        return {
-            'id': self.id,
-            'tax_id': self.tax_id,
-            'company_name': self.company_name,
-            'official_name': self.official_name,
-            'category': self.category,
-            'email': self.email,
-            'phone': self.phone,
-            'address': self.address,
-            'governorate': self.governorate,
-            'website': self.website,
-            'sectors': self.sectors,
-            'tourism_license': self.tourism_license,
-            'registry_number': self.registry_number,
-            'verification_status': self.verification_status,
-            'trust_score': self.trust_score,
-            'status': self.status,
-            'source': self.source,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    # JSON serialization (straight-line dict literal, see _build_to_dict)
+    to_dict = _build_to_dict(_AGENCY_TO_DICT)
     
     @classmethod
     def from_dict(cls, data):
@@ -69,12 +175,10 @@ class Agency(db.Model):
     
     def set_password(self, password):
         """Hash and set password"""
-        from app.extensions import bcrypt
         self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
 
     def check_password(self, password):
         """Check password against hash"""
-        from app.extensions import bcrypt
         return bcrypt.check_password_hash(self.password_hash, password)
 
     @hybrid_property
@@ -85,94 +189,107 @@ class Agency(db.Model):
     def norm_tax_id(cls):
         return func.upper(cls.tax_id)
 
-    @property
+    @staticmethod
+    def _replied_fast_expr():
+        """SQL predicate: review has a reply posted within 24h"""
+        if db.engine.dialect.name == 'sqlite':
+            # SQLite stores DATETIME as text; compare on the julian day scale
+            within = func.julianday(Review.reply_at) <= func.julianday(Review.created_at, '+1 day')
+        else:
+            within = Review.reply_at <= Review.created_at + timedelta(hours=24)
+        return and_(Review.reply.isnot(None), Review.reply != '', Review.reply_at.isnot(None), within)
+
+    @classmethod
+    def review_aggregates(cls, agency_ids=None, session=None):
+        """
+        Per-agency approved review aggregates in one GROUP BY query.
+        Only approved reviews count, so the spam factor sees no rejections.
+
+        Returns: {agency_id: (total, recent, rating_sum, replied_fast)}
+        """
+        recent_cutoff = datetime.utcnow() - timedelta(days=30)
+        query = (session or db.session).query(
+            Review.agency_id,
+            func.count(Review.id),
+            func.sum(case((Review.created_at >= recent_cutoff, 1), else_=0)),
+            func.sum(Review.rating),
+            func.sum(case((cls._replied_fast_expr(), 1), else_=0)),
+        ).filter(Review.status == 'approved')
+        if agency_ids is not None:
+            query = query.filter(Review.agency_id.in_(agency_ids))
+        return {
+            agency_id: (total, recent or 0, rating_sum or 0, fast or 0)
+            for agency_id, total, recent, rating_sum, fast in query.group_by(Review.agency_id)
+        }
+
+    @classmethod
+    def trust_scores_bulk(cls, agencies):
+        """trust_score for many agencies with a single aggregate query: {id: score}"""
+        aggregates = cls.review_aggregates([a.agency_id for a in agencies if a.agency_id])
+        return {
+            a.id: weighted_trust_score(a.status, *aggregates.get(a.agency_id, _NO_REVIEWS))
+            if a.agency_id else 50
+            for a in agencies
+        }
+
+    @cached_property
     def trust_score(self):
         """
-        Dynamic trust score calculated from weighted factors:
-        - recency (0.3): Recent reviews weighted more
-        - volume (0.2): Review count (capped at 100)
-        - avg_rating (0.25): Average rating (1-5 normalized)
-        - reply_rate (0.15): % of reviews with <24h replies
-        - spam_reject (0.1): % of non-spam reviews
-        - verified (0.05): Bonus for approved status (1.1x vs 0.9x)
-        
+        Trust score from the materialized agency_trust row when present,
+        otherwise calculated live from weighted factors (see
+        weighted_trust_score) with reviews aggregated in SQL.
+        Computed once per loaded instance; dropped on load/refresh/expire.
+
         Returns: Score on 0-100 scale
         """
-        from datetime import timedelta
-        from sqlalchemy import func
-        
         if not self.agency_id:
             return 50  # Base for unapproved agencies
-        
-        # Get all approved reviews for this agency
-        reviews = Review.query.filter(
-            Review.agency_id == self.agency_id,
-            Review.status == 'approved'
-        ).all()
-        
-        total_reviews = len(reviews)
-        
-        # Factor 1: Recency weight (30%) - Recent > Old
-        if total_reviews > 0:
-            recent_cutoff = datetime.utcnow() - timedelta(days=30)
-            recent_count = sum(1 for r in reviews if r.created_at >= recent_cutoff)
-            recency = min(recent_count / max(total_reviews, 1) * 1.2, 1.0)
-        else:
-            recency = 0.5  # Neutral if no reviews
-        
-        # Factor 2: Volume weight (20%) - More reviews = higher score
-        volume = min(total_reviews / 100, 1.0)
-        
-        # Factor 3: Average rating (25%) - 1-5 normalized to 0-1
-        if total_reviews > 0:
-            avg_rating = sum(r.rating for r in reviews) / total_reviews
-            avg_rating_normalized = (avg_rating - 1) / 4  # Convert 1-5 to 0-1
-        else:
-            avg_rating_normalized = 0.6  # Neutral
-        
-        # Factor 4: Reply rate (15%) - % with <24h replies
-        if total_reviews > 0:
-            replied_fast = sum(
-                1 for r in reviews 
-                if r.reply and r.reply_at and 
-                (r.reply_at - r.created_at) <= timedelta(hours=24)
-            )
-            reply_rate = replied_fast / total_reviews
-        else:
-            reply_rate = 0.5  # Neutral
-        
-        # Factor 5: Spam rejection (10%) - % of reviews that aren't spam
-        if total_reviews > 0:
-            spam_count = sum(1 for r in reviews if r.status == 'rejected')
-            spam_reject = 1 - (spam_count / total_reviews)
-        else:
-            spam_reject = 1.0  # No spam if no reviews
-        
-        # Factor 6: Verification bonus (5%) - Approved vs Pending
-        verified_multiplier = 1.1 if self.status == 'approved' else 0.9
-        
-        # Calculate weighted score (0-1 scale)
-        weighted_score = (
-            recency * 0.3 +
-            volume * 0.2 +
-            avg_rating_normalized * 0.25 +
-            reply_rate * 0.15 +
-            spam_reject * 0.1
-        ) * verified_multiplier
-        
-        # Convert to 0-100 scale, round to 1 decimal
-        final_score = round(weighted_score * 100, 1)
-        
-        return min(100, max(0, final_score))
+
+        if self.trust_row is not None:
+            return self.trust_row.score
+
+        version = _REVIEW_VERSIONS.get(self.agency_id, 0)
+        now = time.monotonic()
+        cached = _TRUST_CACHE.get(self.agency_id)
+        if cached and cached[0] == version and cached[1] == self.status and cached[2] > now:
+            _TRUST_CACHE.move_to_end(self.agency_id)
+            return cached[3]
+
+        aggregate = Agency.review_aggregates([self.agency_id]).get(self.agency_id, _NO_REVIEWS)
+        score = weighted_trust_score(self.status, *aggregate)
+        _TRUST_CACHE[self.agency_id] = (version, self.status, now + TRUST_CACHE_TTL, score)
+        _TRUST_CACHE.move_to_end(self.agency_id)
+        if len(_TRUST_CACHE) > TRUST_CACHE_MAXSIZE:
+            _TRUST_CACHE.popitem(last=False)
+        return score
 
     def __repr__(self):
         return f'<Agency {self.company_name} ({self.tax_id})>'
 
 
+@event.listens_for(Agency, 'load', raw=True)
+@event.listens_for(Agency, 'refresh', raw=True)
+@event.listens_for(Agency, 'expire', raw=True)
+def _reset_trust_score(state, *args):
+    """Forget the instance's cached trust_score when its state is reloaded"""
+    # InstanceState.dict is empty once the instance was garbage collected,
+    # which expire-on-commit can still visit
+    state.dict.pop('trust_score', None)
+
+
 class Offer(db.Model):
     """Travel Offer Model"""
 
     __tablename__ = 'offers'
+    __table_args__ = (
+        # Catalog search: type + route + dates, and per-agency listings by price
+        db.Index('ix_offers_type_route_date', 'type', 'from_city', 'to_city', 'date_from'),
+        db.Index('ix_offers_agency_type_price', 'agency_id', 'type', 'price'),
+        # Partial index skipping sold-out offers
+        db.Index('ix_offers_active', 'type', 'date_from',
+                 postgresql_where=db.text('seats_available > 0'),
+                 sqlite_where=db.text('seats_available > 0')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     offer_id = db.Column(db.String(20), unique=True, nullable=False, index=True)
@@ -197,38 +314,16 @@ class Offer(db.Model):
     pilgrimage_type = db.Column(db.String(20))  # umrah, hajj
     domestic = db.Column(db.Boolean, default=False)
     capacity = db.Column(db.Integer)  # Total seats
-    tags = db.Column(db.Text)  # JSON array like ["vip", "family"]
+    tags = db.Column(db.JSON)  # JSON array like ["vip", "family"]
 
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=func.now())
 
     # Relationship
-    agency = db.relationship('Agency', backref=db.backref('offers', lazy=True))
+    agency = db.relationship('Agency', back_populates='offers', lazy='joined')
 
-    def to_dict(self):
-        """JSON serialization"""
-        import json
-        return {
-            'offer_id': self.offer_id,
-            'agency_tax_id': self.agency_id,  # Keep for compatibility
-            'agency_name': self.agency.company_name if self.agency else None,
-            'type': self.type,
-            'title': self.title,
-            'price': self.price,
-            'currency': self.currency,
-            'from_city': self.from_city,
-            'to_city': self.to_city,
-            'date_from': self.date_from.isoformat() if self.date_from else None,
-            'date_to': self.date_to.isoformat() if self.date_to else None,
-            'seats_available': self.seats_available,
-            'description': self.description,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'segment': self.segment,
-            'pilgrimage_type': self.pilgrimage_type,
-            'domestic': self.domestic,
-            'capacity': self.capacity,
-            'tags': json.loads(self.tags) if self.tags else []
-        }
+    # JSON serialization (straight-line dict literal, see _build_to_dict)
+    to_dict = _build_to_dict(_OFFER_TO_DICT)
 
     @classmethod
     def from_dict(cls, data):
@@ -243,26 +338,42 @@ class Review(db.Model):
     """Customer Review Model"""
 
     __tablename__ = 'reviews'
+    __table_args__ = (
+        CheckConstraint('rating BETWEEN 1 AND 5', name='ck_reviews_rating'),
+        CheckConstraint('re_rating BETWEEN 1 AND 5', name='ck_reviews_re_rating'),
+        # Per-agency approved reviews (trust aggregates, agency review pages);
+        # the (agency_id, status) prefix serves the plain filter as well
+        db.Index('ix_reviews_agency_status_created', 'agency_id', 'status', 'created_at'),
+        # Client "my reviews": owned rows, or unclaimed rows by email, newest first
+        db.Index('ix_reviews_client_created', 'client_id', 'created_at'),
+        db.Index('ix_reviews_email_created', 'customer_email', 'created_at'),
+        # Status filters and the per-status count/avg(rating) in AgencyStats,
+        # answered from the index alone
+        db.Index('ix_reviews_status_rating', 'status', 'rating'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     review_id = db.Column(db.String(20), unique=True, nullable=False, index=True)
-    agency_id = db.Column(db.String(20), db.ForeignKey('agencies.agency_id'), nullable=False, index=True)
-    client_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)  # For authenticated clients
+    agency_id = db.Column(db.String(20), db.ForeignKey('agencies.agency_id'), nullable=False)  # indexed via ix_reviews_agency_status_created
+    client_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # For authenticated clients (indexed via ix_reviews_client_created)
     customer_name = db.Column(db.String(100), nullable=False)
     customer_email = db.Column(db.String(120), nullable=False)
-    rating = db.Column(db.Integer, nullable=False)  # 1-5 ⭐
+    rating = db.Column(db.SmallInteger, nullable=False)  # 1-5 ⭐
     comment = db.Column(db.Text)
     reply = db.Column(db.Text)  # Agency reply to review
     reply_at = db.Column(db.DateTime)
-    re_rating = db.Column(db.Integer)  # Re-rating after reply
+    re_rating = db.Column(db.SmallInteger)  # Re-rating after reply
     re_comment = db.Column(db.Text)  # Re-comment after reply
     trust_bonus = db.Column(db.Integer, default=0)
-    status = db.Column(db.String(20), default='pending', index=True)  # pending, approved, rejected
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # pending, approved, rejected; active_history loads the old value on set
+    # so the trust flush hook can see a review leave 'approved'
+    status = db.column_property(db.Column(db.String(20), default='pending'), active_history=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=func.now())
 
     # Relationships
-    agency = db.relationship('Agency', backref=db.backref('reviews', lazy=True))
+    agency = db.relationship('Agency', back_populates='reviews', lazy='joined')
     client = db.relationship('User', backref=db.backref('reviews', lazy=True))
 
     def to_dict(self):
@@ -280,6 +391,33 @@ class Review(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+    @classmethod
+    def list_query(cls, session=None):
+        """
+        Column-only query of the to_dict fields, agency name outer-joined in,
+        for list endpoints that don't need Review objects (see row_to_dict)
+        """
+        return (session or db.session).query(
+            cls.id, cls.review_id, cls.agency_id, Agency.company_name.label('agency_name'),
+            cls.customer_name, cls.customer_email, cls.rating, cls.comment, cls.status, cls.created_at
+        ).outerjoin(Agency, Agency.agency_id == cls.agency_id)
+
+    @staticmethod
+    def row_to_dict(row):
+        """to_dict output for a list_query row"""
+        return {
+            'id': row.id,
+            'review_id': row.review_id,
+            'agency_id': row.agency_id,
+            'agency_name': row.agency_name,
+            'customer_name': row.customer_name,
+            'customer_email': row.customer_email,
+            'rating': row.rating,
+            'comment': row.comment,
+            'status': row.status,
+            'created_at': row.created_at.isoformat() if row.created_at else None
+        }
+
     @classmethod
     def from_dict(cls, data):
         """Create from dict (POST)"""
@@ -289,10 +427,65 @@ class Review(db.Model):
         return f'<Review {self.review_id} ({self.customer_name})>'
 
 
+@event.listens_for(Review, 'after_insert')
+@event.listens_for(Review, 'after_update')
+@event.listens_for(Review, 'after_delete')
+def _bump_review_version(mapper, connection, target):
+    """Invalidate the cached trust_score of the reviewed agency"""
+    _REVIEW_VERSIONS[target.agency_id] = _REVIEW_VERSIONS.get(target.agency_id, 0) + 1
+
+
+class AgencyTrust(db.Model):
+    """
+    Materialized Agency.trust_score and TrustScoreCalculator result, written
+    by TrustScoreCalculator.refresh_stored (on flush and by `flask refresh-trust`)
+    """
+
+    __tablename__ = 'agency_trust'
+
+    agency_id = db.Column(db.String(20), db.ForeignKey('agencies.agency_id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    # TrustScoreCalculator result (rules + approved reviews); NULL until first computed
+    rules_score = db.Column(db.Integer)
+    reviews_count = db.Column(db.Integer)
+    evaluation_reasons = db.Column(db.JSON)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=func.now())
+
+    @classmethod
+    def upsert(cls, rows, session=None):
+        """
+        Insert or overwrite agency_trust rows (dicts keyed by column name,
+        all with the same keys) without committing. Only Core statements
+        are emitted, so it is safe to call from flush events.
+        """
+        if db.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        stmt = upsert(cls).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.agency_id],
+            set_={key: stmt.excluded[key] for key in rows[0] if key != 'agency_id'}
+        )
+        (session or db.session).execute(stmt)
+
+    def __repr__(self):
+        return f'<AgencyTrust {self.agency_id} {self.score}>'
+
+
 class PendingAgency(db.Model):
     """Pending Agency Registration Model"""
 
     __tablename__ = 'pending_agencies'
+    __table_args__ = (
+        # Admin review queue: pending rows, newest first
+        db.Index('ix_pending_agencies_status_created', 'status', 'created_at'),
+        # At most one pending registration per RNE; rejected ones may repeat
+        db.Index('ux_pending_agencies_tax_id_pending', 'agency_tax_id', unique=True,
+                 postgresql_where=text("status = 'pending'"),
+                 sqlite_where=text("status = 'pending'")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     pending_id = db.Column(db.String(20), unique=True, nullable=False, index=True)
@@ -317,11 +510,12 @@ class PendingAgency(db.Model):
     password_hash = db.Column(db.String(128))
 
     # Status
-    status = db.Column(db.String(20), default='pending', index=True)  # pending, approved, rejected
+    status = db.Column(db.String(20), default='pending')  # pending, approved, rejected (indexed via ix_pending_agencies_status_created)
 
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=func.now())
 
     def to_dict(self):
         """JSON serialization"""
@@ -352,12 +546,10 @@ class PendingAgency(db.Model):
 
     def set_password(self, password):
         """Hash and set password"""
-        from app.extensions import bcrypt
         self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
 
     def check_password(self, password):
         """Check password against hash"""
-        from app.extensions import bcrypt
         return bcrypt.check_password_hash(self.password_hash, password)
 
     def __repr__(self):
@@ -390,12 +582,10 @@ class User(db.Model):
 
     def set_password(self, password):
         """Hash and set password"""
-        from app.extensions import bcrypt
         self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
 
     def check_password(self, password):
         """Check password against hash"""
-        from app.extensions import bcrypt
         return bcrypt.check_password_hash(self.password_hash, password)
 
     def __repr__(self):
@@ -404,10 +594,6 @@ class User(db.Model):
 
 def create_test_pending_agency():
     """Create test pending agency for Insomnia"""
-    from app import db
-    from . import PendingAgency
-    from datetime import datetime
-
     # Check if exists
     if PendingAgency.query.filter_by(pending_id='P-7f3a2b').first():
         print("✅ P-7f3a2b exists!")
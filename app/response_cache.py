@@ -0,0 +1,71 @@
+"""
+Short-TTL response cache and conditional GET for read-heavy /v1/agencies
+endpoints.
+
+Entries are encoded JSON bytes keyed by endpoint, path, query string and a
+data version that every ORM insert/update/delete of an Agency or Review
+bumps, so a write made through this process is visible on the next request.
+The TTL bounds staleness from other workers and from Core bulk updates.
+
+The ETag is a hash of the encoded body, stored with the entry, so it is the
+same on every worker while the data is unchanged; a matching If-None-Match
+on a cache hit gets a 304 without running the handler.
+"""
+import hashlib
+import itertools
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event
+
+from app.extensions import api, cache
+from app.models import Agency, Review
+
+RESPONSE_CACHE_TTL = 10
+
+_versions = itertools.count(1)
+data_version = 0
+
+
+def bump_data_version(*args):
+    """Invalidate every cached response (mapper event signature)"""
+    global data_version
+    data_version = next(_versions)
+
+
+for _model in (Agency, Review):
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, bump_data_version)
+
+
+def cached_response(name, timeout=RESPONSE_CACHE_TTL):
+    """
+    Cache a Resource method's (payload, status) result as encoded bytes
+    plus their ETag.
+
+    Hits skip the handler and JSON encoding; responses carry X-Cache:
+    HIT/MISS, and a matching If-None-Match turns them into an empty 304.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            key = f'response:{name}:{data_version}:{request.full_path}'
+            hit = cache.get(key)
+            if hit is not None:
+                body, status, etag = hit
+                response = current_app.response_class(body, status=status, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+            else:
+                data, status = f(*args, **kwargs)
+                response = api.make_response(data, status)
+                if status != 200:
+                    return response
+                body = response.get_data()
+                etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+                cache.set(key, (body, status, etag), timeout=timeout)
+                response.headers['X-Cache'] = 'MISS'
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = f'private, max-age={timeout}'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
@@ -1,7 +1,11 @@
-from flask import Blueprint, jsonify
+from datetime import datetime
+from flask import Blueprint, jsonify, request
+from sqlalchemy import update
+from sqlalchemy.orm import defer
 from flask_jwt_extended import jwt_required
 from app.decorators import admin_required
 from app.models import PendingAgency, Agency, Review
+from app.services.trust_score_calculator import TrustScoreCalculator
 from app.extensions import db
 
 admin_bp = Blueprint('admin', __name__)
@@ -10,8 +14,19 @@ admin_bp = Blueprint('admin', __name__)
 @jwt_required()
 @admin_required
 def get_pending_agencies():
-    """Get all pending agencies for admin review"""
-    pending_agencies = PendingAgency.query.filter_by(status='pending').all()
+    """Get pending agencies for admin review, newest first (?page=&page_size=)"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = min(max(request.args.get('page_size', 50, type=int), 1), 200)
+
+    pending_agencies = (
+        PendingAgency.query
+        .filter_by(status='pending')
+        .options(defer(PendingAgency.password_hash))
+        .order_by(PendingAgency.created_at.desc())
+        .limit(page_size)
+        .offset((page - 1) * page_size)
+        .all()
+    )
     return jsonify([agency.to_dict() for agency in pending_agencies]), 200
 
 @admin_bp.route('/bulk_approve_agencies', methods=['POST'])
@@ -19,11 +34,16 @@ def get_pending_agencies():
 @admin_required
 def bulk_approve_agencies():
     """Bulk approve all pending agencies"""
-    pending_agencies = Agency.query.filter_by(status='pending').all()
-    count = 0
-    for agency in pending_agencies:
-        agency.status = 'approved'
-        count += 1
+    # One set-based UPDATE instead of hydrating and flushing every agency
+    result = db.session.execute(
+        update(Agency)
+        .where(Agency.status == 'pending')
+        .values(status='approved', updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    count = result.rowcount
+    # Status feeds the stored scores; Core UPDATEs skip the flush hook
+    TrustScoreCalculator.refresh_stored()
     db.session.commit()
     return jsonify({
         'message': f'Bulk approved {count} agencies',
@@ -1,33 +1,83 @@
 import os
 import re
-import uuid
+import hashlib
 import smtplib
+from datetime import datetime, timedelta
+from secrets import token_hex
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
+from urllib.parse import urlencode
 from flask import Blueprint, request, abort, current_app
 from werkzeug.utils import secure_filename
-from sqlalchemy import func
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.services.agency_service import AgencyService
 from app.services.trust_score_calculator import TrustScoreCalculator
 from app.models import PendingAgency, Agency, Review, User
-from app.extensions import db
+from app.extensions import db, cache
 from app.decorators import role_required
 
 agencies_bp = Blueprint('agencies', __name__)
 
-def send_email(to, subject, body):
+RNE_RE = re.compile(r'^[0-9]{8}[A-Z]$')
+
+# License uploads: copy in 1MB chunks (at most a handful of syscalls for a 5MB file)
+UPLOAD_COPY_BUFFER = 1024 * 1024
+_upload_dirs = set()
+
+def upload_dir():
+    """static/uploads for the current app, created on first use only"""
+    path = os.path.join(current_app.root_path, 'static', 'uploads')
+    if path not in _upload_dirs:
+        os.makedirs(path, exist_ok=True)
+        _upload_dirs.add(path)
+    return path
+
+# SMTP runs on a small worker pool so a slow mail server never blocks a request
+_email_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='email')
+
+def _deliver_email(app, to, subject, body):
     msg = MIMEText(body)
     msg['Subject'] = subject
     msg['From'] = 'noreply@nexaway.com'
     msg['To'] = to
     try:
-        server = smtplib.SMTP('localhost')
+        server = smtplib.SMTP('localhost', timeout=10)
         server.sendmail('noreply@nexaway.com', to, msg.as_string())
         server.quit()
     except Exception as e:
-        current_app.logger.error(f"Failed to send email: {e}")
+        app.logger.error(f"Failed to send email: {e}")
+
+# Cached listings are keyed under a generation number; bumping it orphans
+# this blueprint's entries (they age out) without touching other cache users
+AGENCY_CACHE_GENERATION = 'agencies_bp:generation'
+
+def agency_cache_key(*args, **kwargs):
+    """Cache key for agency listings: generation, path and sorted query string"""
+    generation = cache.get(AGENCY_CACHE_GENERATION) or 0
+    return f'agencies_bp:{generation}:{request.path}?{urlencode(sorted(request.args.items(multi=True)))}'
+
+def invalidate_agency_cache():
+    """Drop cached agency listings after a write that changes them"""
+    # timeout=0: the counter must outlive every entry keyed under it
+    cache.set(AGENCY_CACHE_GENERATION, (cache.get(AGENCY_CACHE_GENERATION) or 0) + 1, timeout=0)
+
+@agencies_bp.after_request
+def add_etag(response):
+    """Tag GET responses by body hash and answer If-None-Match with 304"""
+    if request.method != 'GET' or response.status_code != 200 or response.direct_passthrough:
+        return response
+    response.set_etag(hashlib.blake2b(response.get_data(), digest_size=16).hexdigest())
+    return response.make_conditional(request)
+
+def send_email(to, subject, body):
+    """Queue an email for background delivery and return immediately"""
+    _email_pool.submit(_deliver_email, current_app._get_current_object(), to, subject, body)
 
 @agencies_bp.route('/agencies', methods=['GET'])
+@cache.cached(timeout=60, make_cache_key=agency_cache_key)
 def get_agencies():
     """
     Get all APPROVED agencies with comprehensive trust score evaluation
@@ -43,14 +93,13 @@ def get_agencies():
     Returns: List of approved agencies sorted by trust score (highest first)
     """
     approved_agencies = Agency.query.filter_by(status='approved').all()
+
+    # Stored calculator results (agency_trust, joined in); misses computed in bulk
+    results = TrustScoreCalculator.stored_trust_scores(approved_agencies)
     
     agencies_data = []
     for agency in approved_agencies:
-        # Get reviews
-        reviews = Review.query.filter_by(agency_id=agency.agency_id, status='approved').all()
-        
-        # Calculate trust score using standardized calculator
-        result = TrustScoreCalculator.calculate_trust_score(agency, reviews)
+        result = results[agency.id]
         
         agencies_data.append({
             'agency_id': agency.agency_id,
@@ -65,7 +114,7 @@ def get_agencies():
             'sectors': agency.sectors,
             'trust_score': result['score'],
             'status': agency.status,
-            'reviews_count': len(reviews),
+            'reviews_count': result['reviews_count'],
             'evaluation_reasons': result['reasons'],
             'created_at': agency.created_at.isoformat() if agency.created_at else None,
             'updated_at': agency.updated_at.isoformat() if agency.updated_at else None
@@ -103,8 +152,7 @@ def get_agency(id):
 
 @agencies_bp.route('/agencies/<tax_id>', methods=['GET'])
 def get_agency_by_tax_id(tax_id):
-    agencies = AgencyService.load_csv()
-    agency = next((a for a in agencies if a['tax_id'] == tax_id), None)
+    agency = AgencyService.get_agency_by_tax_id(tax_id)
     if not agency:
         return {"error": "Agency not found"}, 404
 
@@ -115,11 +163,10 @@ def search_agencies():
     governorate = request.args.get('governorate')
     min_trust = request.args.get('min_trust', type=int)
 
-    agencies = AgencyService.get_agencies_sorted_by_trust()
-
-    filtered = agencies
     if governorate:
-        filtered = [a for a in filtered if a.get('governorate', '').lower() == governorate.lower()]
+        filtered = AgencyService.get_agencies_by_governorate(governorate)
+    else:
+        filtered = AgencyService.get_agencies_sorted_by_trust()
     if min_trust:
         filtered = [a for a in filtered if a.get('trust_score', 0) >= min_trust]
 
@@ -133,28 +180,16 @@ def search_agencies():
     }
 
 @agencies_bp.route('/agencies/stats', methods=['GET'])
+@cache.cached(timeout=60, make_cache_key=agency_cache_key)
 def get_agency_stats():
-    agencies = AgencyService.load_csv()
-
-    # Governorate stats
-    stats = {}
-    for agency in agencies:
-        gov = agency.get('governorate', 'Unknown')
-        stats[gov] = stats.get(gov, 0) + 1
-
-    # Calculations
-    total = len(agencies)
-    avg_trust = sum(float(a.get('trust_score', 50)) for a in agencies) / total if total > 0 else 0
+    stats = AgencyService.get_csv_stats()
 
     # Get top-rated agencies
     top_rated_limit = request.args.get('top_rated_limit', 5, type=int)
     top_rated_agencies = AgencyService.get_agencies_sorted_by_trust()[:top_rated_limit]
 
     return {
-        'stats': stats,
-        'total': total,
-        'avg_trust': round(avg_trust, 1),
-        'top_governorate': max(stats.items(), key=lambda x: x[1], default=('None', 0)),
+        **stats,
         'highest_rated_agencies': top_rated_agencies
     }
 
@@ -163,9 +198,12 @@ def get_agency_stats():
 @agencies_bp.route('/agencies/<tax_id>', methods=['PATCH', 'DELETE'])
 def agency_ops(tax_id):
     if request.method == 'PATCH':
-        return AgencyService.update_agency(tax_id, request.json)
+        result = AgencyService.update_agency(tax_id, request.json)
+        invalidate_agency_cache()
+        return result
     if request.method == 'DELETE':
         AgencyService.delete_agency(tax_id)
+        invalidate_agency_cache()
         return '', 204
 
 @agencies_bp.route('/agencies/register', methods=['POST'])
@@ -185,19 +223,6 @@ def register_agency():
     address = request.form.get('address')
     license_image = request.files['license_image']
 
-    # DEBUG PRINTS - REMOVE AFTER FIX
-    print("=" * 50)
-    print("FORM DATA RECEIVED:")
-    print(dict(request.form))
-    print("FILES RECEIVED:")
-    print(list(request.files.keys()))
-    print("LICENSE FILENAME:", request.files['license_image'].filename if 'license_image' in request.files else "MISSING")
-    print("AGENCY_TAX_ID:", request.form.get('agency_tax_id'))
-    print("AGENCY_NAME:", request.form.get('agency_name'))
-    print("GOVERNORATE:", request.form.get('governorate'))
-    print("ADDRESS:", request.form.get('address'))
-    print("=" * 50)
-
     # Validate required fields
     if not all([agency_tax_id, agency_name, owner_name, owner_phone, owner_email, governorate, address]):
         return {"error": "All fields required"}, 400
@@ -206,6 +231,11 @@ def register_agency():
     if not validate_rne_format(agency_tax_id):
         return {"error": "Invalid RNE format (must be 8 digits)"}, 400
 
+    # Reject known RNEs before touching the upload or sending mail (both indexed)
+    if (Agency.query.filter_by(tax_id=agency_tax_id).first()
+            or PendingAgency.query.filter_by(agency_tax_id=agency_tax_id, status='pending').first()):
+        return {"error": "Agency already registered"}, 409
+
     # Validate file
     if license_image.filename == '':
         return {"error": "No file selected"}, 400
@@ -221,14 +251,12 @@ def register_agency():
         return {"error": "File too large (max 5MB)"}, 413
 
     # Generate pending ID
-    pending_id = f"P-{uuid.uuid4().hex[:8].upper()}"
+    pending_id = f"P-{token_hex(4).upper()}"
 
     # Save file
     filename = f"{pending_id}.jpg"
-    upload_dir = os.path.join(current_app.root_path, 'static', 'uploads')
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, filename)
-    license_image.save(file_path)
+    file_path = os.path.join(upload_dir(), filename)
+    license_image.save(file_path, buffer_size=UPLOAD_COPY_BUFFER)
 
     # Create pending record
     pending = PendingAgency(
@@ -243,7 +271,14 @@ def register_agency():
     pending.license_image_url = f"/static/uploads/{filename}"
 
     db.session.add(pending)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent registration for the same RNE won the unique index
+        db.session.rollback()
+        os.remove(file_path)
+        return {"error": "Agency already registered"}, 409
+    current_app.logger.debug("pending registration %s (RNE %s)", pending_id, agency_tax_id)
 
     # Send email to admin
     send_email(
@@ -267,11 +302,6 @@ def get_pending_agencies():
     total = query.count()
     pendings = query.offset((page-1)*limit).limit(limit).all()
 
-    # DEBUG PRINT - REMOVE AFTER FIX
-    print(f"DEBUG: Found {total} pending agencies")
-    for p in pendings[:3]:  # Print first 3
-        print(f"  {p.pending_id}: {p.company_name} ({p.agency_tax_id})")
-
     return {
         'data': [p.to_dict() for p in pendings],
         'total': total,
@@ -303,17 +333,13 @@ def approve_pending_agency(pending_id):
         verification_status='verified'
     )
 
-    # Generate agency_id (A-xxx)
-    agency.agency_id = f"A-{agency.id:03d}" if agency.id else "A-001"
-
     db.session.add(agency)
     db.session.delete(pending)
+    # Flush to get the primary key, then derive agency_id (A-xxx) in the same transaction
+    db.session.flush()
+    agency.agency_id = f"A-{agency.id:03d}"
     db.session.commit()
-
-    # Update agency_id after commit (to get the ID)
-    if agency.id:
-        agency.agency_id = f"A-{agency.id:03d}"
-        db.session.commit()
+    invalidate_agency_cache()
 
     # Send approval email
     send_email(
@@ -340,6 +366,7 @@ def reject_pending_agency(pending_id):
     # Delete pending record
     db.session.delete(pending)
     db.session.commit()
+    invalidate_agency_cache()
 
     # Send rejection email
     send_email(
@@ -351,6 +378,7 @@ def reject_pending_agency(pending_id):
     return {"status": "rejected"}, 200
 
 @agencies_bp.route('/agencies/top-rated', methods=['GET'])
+@cache.cached(timeout=60, make_cache_key=agency_cache_key)
 def get_top_rated_agencies():
     """Get top-rated agencies (by trust score)"""
     limit = request.args.get('limit', 10, type=int)
@@ -364,12 +392,12 @@ def get_top_rated_agencies():
     }
 
 @agencies_bp.route('/agencies/top-rated/governorate/<governorate>', methods=['GET'])
+@cache.cached(timeout=60, make_cache_key=agency_cache_key)
 def get_top_rated_agencies_by_governorate(governorate):
     """Get top-rated agencies in a specific governorate"""
     limit = request.args.get('limit', 10, type=int)
 
-    agencies = AgencyService.get_agencies_sorted_by_trust()
-    filtered = [a for a in agencies if a.get('governorate', '').lower() == governorate.lower()][:limit]
+    filtered = AgencyService.get_agencies_by_governorate(governorate)[:limit]
 
     return {
         'data': filtered,
@@ -384,8 +412,7 @@ def debug_routes():
 
 def validate_rne_format(rne):
     """Validate RNE format (must be 8 digits + 1 letter, no dash)"""
-    import re
-    return re.match(r'^[0-9]{8}[A-Z]$', rne) is not None
+    return RNE_RE.match(rne) is not None
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -424,6 +451,7 @@ def reply_to_review(review_id):
         review.trust_bonus = 10
 
     db.session.commit()
+    invalidate_agency_cache()
 
     return {"message": "Reply posted successfully"}, 200
 
@@ -437,17 +465,19 @@ def agency_dashboard():
     user_id = int(claims['sub'])
 
     # Get user and agency
-    user = User.query.get(user_id)
+    user = User.query.options(joinedload(User.agency)).get(user_id)
     if not user or not user.agency_id:
         return {"error": "Agency not found"}, 404
 
     agency_id = user.agency_id
 
-    # Stats query
+    # Approved-review stats and unreplied count in one pass over the agency's reviews
+    approved = Review.status == 'approved'
     reviews_stats = db.session.query(
-        func.avg(Review.rating).label('avg_rating'),
-        func.count().label('total_reviews')
-    ).filter(Review.agency_id == agency_id, Review.status == 'approved').first()
+        func.avg(case((approved, Review.rating))).label('avg_rating'),
+        func.sum(case((approved, 1), else_=0)).label('total_reviews'),
+        func.sum(case((Review.reply.is_(None), 1), else_=0)).label('unreplied'),
+    ).filter(Review.agency_id == agency_id).one()
 
     # Recent reviews
     recent_reviews = Review.query.filter(
@@ -461,10 +491,7 @@ def agency_dashboard():
         'trust_score': trust_score,
         'avg_rating': float(reviews_stats.avg_rating or 0),
         'total_reviews': reviews_stats.total_reviews or 0,
-        'unreplied_reviews': Review.query.filter(
-            Review.agency_id == agency_id,
-            Review.reply.is_(None)
-        ).count(),
+        'unreplied_reviews': reviews_stats.unreplied or 0,
         'recent_reviews': [r.to_dict() for r in recent_reviews]
     }
 
@@ -476,21 +503,18 @@ def get_agency_dashboard(agency_id):
     if not agency:
         return {"error": "Agency not found"}, 404
 
-    # Unreplied count: approved reviews with no reply
-    unreplied_count = Review.query.filter(
-        Review.agency_id == agency_id,
-        Review.status == 'approved',
-        Review.reply.is_(None)
-    ).count()
-
-    # Avg rating 30d: average rating for reviews in last 30 days
-    from datetime import datetime, timedelta
+    # One pass over approved reviews:
+    # unreplied = no reply yet, avg_rating_30d = average rating over the last 30 days
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    avg_rating_30d = db.session.query(func.avg(Review.rating)).filter(
+    unreplied_count, avg_rating_30d = db.session.query(
+        func.sum(case((Review.reply.is_(None), 1), else_=0)),
+        func.avg(case((Review.created_at >= thirty_days_ago, Review.rating))),
+    ).filter(
         Review.agency_id == agency_id,
-        Review.status == 'approved',
-        Review.created_at >= thirty_days_ago
-    ).scalar() or 0
+        Review.status == 'approved'
+    ).one()
+    unreplied_count = unreplied_count or 0
+    avg_rating_30d = avg_rating_30d or 0
 
     # Trust trend: current trust score (for now, since historical not stored)
     # In future, could compare with previous calculation
@@ -3,13 +3,15 @@ Agencies API Routes using Flask-RESTX
 Provides endpoints for agency management and trust scoring
 """
 
-import uuid
-from flask import request
+import orjson
+from flask import Response, request, stream_with_context
 from flask_restx import Resource, fields, reqparse
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func
-from app.models import Agency, Review
+from sqlalchemy.orm import contains_eager
+from app.models import Agency, AgencyTrust, Review
 from app.extensions import db, api
+from app.response_cache import cached_response
 from app.services.agency_service import AgencyService
 from app.services.trust_score_calculator import TrustScoreCalculator
 
@@ -44,20 +46,46 @@ class AgencyList(Resource):
     @agencies_ns.doc('list_agencies')
     @agencies_ns.param('status', 'Filter by status: approved/pending/rejected')
     @agencies_ns.param('category', 'Filter by category')
+    @agencies_ns.param('governorate', 'Filter by governorate (case-insensitive)')
+    @agencies_ns.param('page', 'Page number (with limit)')
+    @agencies_ns.param('limit', 'Page size; omit to return every agency')
     @agencies_ns.response(200, 'Success')
+    @cached_response('agency_list')
     def get(self):
         """Get all approved agencies with trust scores"""
         status = request.args.get('status', 'approved')
-        approved_agencies = Agency.query.filter_by(status=status).all()
+        category = request.args.get('category')
+        governorate = request.args.get('governorate')
 
-        agencies_data = []
-        for agency in approved_agencies:
-            reviews = Review.query.filter_by(
-                agency_id=agency.agency_id, 
-                status='approved'
-            ).all()
+        # Ordered and paginated in SQL on the stored calculator score;
+        # agencies without one yet (see `flask refresh-trust`) sort last
+        query = Agency.query.outerjoin(Agency.trust_row).options(
+            contains_eager(Agency.trust_row)
+        ).filter(Agency.status == status)
+        if category:
+            query = query.filter(Agency.category == category)
+        if governorate:
+            query = query.filter(func.lower(Agency.governorate) == governorate.lower())
+        query = query.order_by(AgencyTrust.rules_score.desc().nullslast(), Agency.id)
+
+        response = {'status': status}
+        limit = request.args.get('limit', type=int)
+        if limit and limit > 0:
+            page = max(request.args.get('page', 1, type=int), 1)
+            total = query.order_by(None).count()
+            agencies = query.limit(limit).offset((page - 1) * limit).all()
+            response.update({'page': page, 'pages': (total + limit - 1) // limit})
+        else:
+            agencies = query.all()
+            total = len(agencies)
+        response['total'] = total
 
-            result = TrustScoreCalculator.calculate_trust_score(agency, reviews)
+        # Stored calculator results from the joined agency_trust rows; misses computed in bulk
+        results = TrustScoreCalculator.stored_trust_scores(agencies)
+
+        agencies_data = []
+        for agency in agencies:
+            result = results[agency.id]
             agencies_data.append({
                 'agency_id': agency.agency_id,
                 'tax_id': agency.tax_id,
@@ -69,38 +97,32 @@ class AgencyList(Resource):
                 'governorate': agency.governorate,
                 'trust_score': result['score'],
                 'status': agency.status,
-                'reviews_count': len(reviews)
+                'reviews_count': result['reviews_count']
             })
 
-        agencies_data.sort(key=lambda x: x['trust_score'], reverse=True)
+        return {'data': agencies_data, **response}, 200
 
-        return {
-            'data': agencies_data,
-            'total': len(agencies_data),
-            'status': status
-        }, 200
+
+# Registration form fields, built once at import (Resources are instantiated per request)
+register_parser = reqparse.RequestParser()
+register_parser.add_argument('agency_name', type=str, required=True, location='form')
+register_parser.add_argument('tax_id', type=str, required=True, location='form')
+register_parser.add_argument('email', type=str, required=True, location='form')
+register_parser.add_argument('governorate', type=str, required=True, location='form')
+register_parser.add_argument('phone', type=str, required=True, location='form')
+register_parser.add_argument('official_name', type=str, required=False, location='form')
+register_parser.add_argument('category', type=str, required=False, location='form')
+register_parser.add_argument('sectors', type=str, required=False, location='form')
 
 
 @agencies_ns.route('/register')
 class AgencyRegister(Resource):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.parser = reqparse.RequestParser()
-        self.parser.add_argument('agency_name', type=str, required=True, location='form')
-        self.parser.add_argument('tax_id', type=str, required=True, location='form')
-        self.parser.add_argument('email', type=str, required=True, location='form')
-        self.parser.add_argument('governorate', type=str, required=True, location='form')
-        self.parser.add_argument('phone', type=str, required=True, location='form')
-        self.parser.add_argument('official_name', type=str, required=False, location='form')
-        self.parser.add_argument('category', type=str, required=False, location='form')
-        self.parser.add_argument('sectors', type=str, required=False, location='form')
-
     @agencies_ns.doc('register_agency')
     @agencies_ns.response(201, 'Created')
     @agencies_ns.response(400, 'Bad Request')
     def post(self):
         """Register new agency with form data (pending approval). Required: agency_name, tax_id, email, governorate, phone"""
-        args = self.parser.parse_args()
+        args = register_parser.parse_args()
         
         # Convert to dict format expected by AgencyService
         data = {
@@ -126,15 +148,11 @@ class AgencyDetail(Resource):
     @agencies_ns.doc('get_agency')
     @agencies_ns.response(200, 'Success', agency_response)
     @agencies_ns.response(404, 'Not Found')
+    @cached_response('agency_detail')
     def get(self, agency_id):
         """Get agency details by ID"""
         agency = Agency.query.filter_by(agency_id=agency_id).first_or_404()
-        reviews = Review.query.filter_by(
-            agency_id=agency.agency_id,
-            status='approved'
-        ).all()
-
-        result = TrustScoreCalculator.calculate_trust_score(agency, reviews)
+        result = TrustScoreCalculator.stored_trust_scores([agency])[agency.id]
         return {
             'agency_id': agency.agency_id,
             'tax_id': agency.tax_id,
@@ -147,7 +165,7 @@ class AgencyDetail(Resource):
             'website': agency.website,
             'trust_score': result['score'],
             'status': agency.status,
-            'reviews_count': len(reviews),
+            'reviews_count': result['reviews_count'],
             'evaluation_reasons': result['reasons']
         }, 200
 
@@ -162,51 +180,65 @@ class AgencyReviews(Resource):
         agency = Agency.query.filter_by(agency_id=agency_id).first_or_404()
         status = request.args.get('status', 'approved')
 
-        reviews = Review.query.filter_by(
-            agency_id=agency.agency_id,
-            status=status
-        ).all()
+        rows = Review.list_query().filter(
+            Review.agency_id == agency.agency_id,
+            Review.status == status
+        ).yield_per(500)
 
-        return {
-            'agency_id': agency_id,
-            'reviews': [r.to_dict() for r in reviews],
-            'total': len(reviews)
-        }, 200
+        def generate():
+            # Same payload as before, encoded row by row so neither the rows
+            # nor the full JSON document are held in memory at once
+            yield b'{"agency_id":' + orjson.dumps(agency_id) + b',"reviews":['
+            total = 0
+            for row in rows:
+                yield (b',' if total else b'') + orjson.dumps(Review.row_to_dict(row))
+                total += 1
+            yield b'],"total":%d}\n' % total
+
+        return Response(stream_with_context(generate()), mimetype='application/json')
 
 
 @agencies_ns.route('/stats')
 class AgencyStats(Resource):
     @agencies_ns.doc('get_agency_stats')
     @agencies_ns.response(200, 'Success')
+    @cached_response('agency_stats')
     def get(self):
         """Get aggregate statistics about all agencies"""
-        total_agencies = Agency.query.count()
-        approved_agencies = Agency.query.filter_by(status='approved').count()
-        pending_agencies = Agency.query.filter_by(status='pending').count()
-        rejected_agencies = Agency.query.filter_by(status='rejected').count()
+        # Agency counts per status and approved counts per governorate from
+        # one (status, governorate) GROUP BY, demultiplexed below
+        agency_counts = {}
+        governorate_stats = {}
+        for status, gov, count, with_id in db.session.query(
+            Agency.status, Agency.governorate, func.count(), func.count(Agency.agency_id)
+        ).group_by(Agency.status, Agency.governorate):
+            agency_counts[status] = agency_counts.get(status, 0) + count
+            if status == 'approved' and gov:
+                governorate_stats[gov] = with_id
+        total_agencies = sum(agency_counts.values())
+        approved_agencies = agency_counts.get('approved', 0)
+        pending_agencies = agency_counts.get('pending', 0)
+        rejected_agencies = agency_counts.get('rejected', 0)
         
-        total_reviews = Review.query.count()
-        approved_reviews = Review.query.filter_by(status='approved').count()
-        pending_reviews = Review.query.filter_by(status='pending').count()
-        rejected_reviews = Review.query.filter_by(status='rejected').count()
+        # Review counts with the approved average rating folded into the same query
+        review_rows = db.session.query(
+            Review.status, func.count(), func.avg(Review.rating)
+        ).group_by(Review.status).all()
+        review_counts = {status: count for status, count, _ in review_rows}
+        total_reviews = sum(review_counts.values())
+        approved_reviews = review_counts.get('approved', 0)
+        pending_reviews = review_counts.get('pending', 0)
+        rejected_reviews = review_counts.get('rejected', 0)
+        avg_rating = {status: avg for status, _, avg in review_rows}.get('approved') or 0
         
         # Get average trust score
         agencies = Agency.query.filter_by(status='approved').all()
-        trust_scores = []
-        for agency in agencies:
-            reviews = Review.query.filter_by(agency_id=agency.agency_id, status='approved').all()
-            result = TrustScoreCalculator.calculate_trust_score(agency, reviews)
-            trust_scores.append(result['score'])
+        trust_scores = [
+            result['score'] for result in TrustScoreCalculator.stored_trust_scores(agencies).values()
+        ]
         
         avg_trust_score = sum(trust_scores) / len(trust_scores) if trust_scores else 0
         
-        # Get statistics by governorate
-        governorates = db.session.query(Agency.governorate, func.count(Agency.agency_id)).filter_by(status='approved').group_by(Agency.governorate).all()
-        governorate_stats = {gov: count for gov, count in governorates if gov}
-        
-        # Get average rating
-        avg_rating = db.session.query(func.avg(Review.rating)).filter_by(status='approved').scalar() or 0
-        
         return {
             'total_agencies': total_agencies,
             'agencies_by_status': {
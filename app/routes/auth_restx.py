@@ -3,12 +3,9 @@ Authentication API Routes using Flask-RESTX
 Provides Admin, Agency, and Client authentication endpoints
 """
 
-import uuid
-from flask import request
 from flask_restx import Resource, fields
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from app.models import User, Agency
-from app.extensions import db, api
+from app.extensions import api
+from app.services.auth_service import AuthError, AuthService
 
 # Create namespace with /v1 prefix
 auth_ns = api.namespace('v1/auth', description='Authentication operations')
@@ -30,6 +27,12 @@ error_model = api.model('Error', {
 })
 
 
+@auth_ns.errorhandler(AuthError)
+def handle_auth_error(error):
+    """AuthService failures as the namespace's usual {"message": ...} body"""
+    return {'message': error.message}, error.status
+
+
 @auth_ns.route('/admin/login')
 class AdminLogin(Resource):
     @auth_ns.doc('admin_login', security=[])
@@ -39,19 +42,7 @@ class AdminLogin(Resource):
     @auth_ns.response(401, 'Unauthorized', error_model)
     def post(self):
         """Admin login endpoint - returns JWT token"""
-        data = request.get_json()
-        if not data or 'email' not in data or 'password' not in data:
-            auth_ns.abort(400, "Email and password required")
-
-        user = User.query.filter_by(email=data['email'], role='admin').first()
-        if not user or not user.check_password(data['password']):
-            auth_ns.abort(401, "Invalid credentials")
-
-        access_token = create_access_token(
-            identity=user.id,
-            additional_claims={"sub": str(user.id), "role": user.role}
-        )
-        return {"access_token": access_token, "role": user.role}, 200
+        return AuthService.login('admin')
 
 
 @auth_ns.route('/agency/login')
@@ -63,19 +54,7 @@ class AgencyLogin(Resource):
     @auth_ns.response(401, 'Unauthorized', error_model)
     def post(self):
         """Agency login endpoint - returns JWT token"""
-        data = request.get_json()
-        if not data or 'email' not in data or 'password' not in data:
-            auth_ns.abort(400, "Email and password required")
-
-        user = User.query.filter_by(email=data['email'], role='agency').first()
-        if not user or not user.check_password(data['password']):
-            auth_ns.abort(401, "Invalid credentials")
-
-        access_token = create_access_token(
-            identity=user.id,
-            additional_claims={"sub": str(user.id), "role": user.role}
-        )
-        return {"access_token": access_token, "role": user.role}, 200
+        return AuthService.login('agency')
 
 
 @auth_ns.route('/client/login')
@@ -87,19 +66,7 @@ class ClientLogin(Resource):
     @auth_ns.response(401, 'Unauthorized', error_model)
     def post(self):
         """Client login endpoint - returns JWT token"""
-        data = request.get_json()
-        if not data or 'email' not in data or 'password' not in data:
-            auth_ns.abort(400, "Email and password required")
-
-        user = User.query.filter_by(email=data['email'], role='client').first()
-        if not user or not user.check_password(data['password']):
-            auth_ns.abort(401, "Invalid credentials")
-
-        access_token = create_access_token(
-            identity=user.id,
-            additional_claims={"sub": str(user.id), "role": user.role}
-        )
-        return {"access_token": access_token, "role": user.role}, 200
+        return AuthService.login('client')
 
 
 @auth_ns.route('/client/register')
@@ -111,23 +78,7 @@ class ClientRegister(Resource):
     @auth_ns.response(409, 'Conflict', error_model)
     def post(self):
         """Client registration endpoint - creates account and returns JWT"""
-        data = request.get_json()
-        if not data or 'email' not in data or 'password' not in data:
-            auth_ns.abort(400, "Email and password required")
-
-        if User.query.filter_by(email=data['email']).first():
-            auth_ns.abort(409, "Email already registered")
-
-        user = User(email=data['email'], role='client')
-        user.set_password(data['password'])
-        db.session.add(user)
-        db.session.commit()
-
-        access_token = create_access_token(
-            identity=user.id,
-            additional_claims={"sub": str(user.id), "role": user.role}
-        )
-        return {"access_token": access_token, "role": user.role}, 201
+        return AuthService.register_client()
 
 
 @auth_ns.route('/agency/claim/<agency_id>')
@@ -140,27 +91,4 @@ class ClaimAgency(Resource):
     @auth_ns.response(409, 'Conflict', error_model)
     def post(self, agency_id):
         """Claim approved agency account with email verification"""
-        data = request.get_json()
-        if not data or 'email' not in data or 'password' not in data:
-            auth_ns.abort(400, "Email and password required")
-
-        agency = Agency.query.filter_by(agency_id=agency_id, status='approved').first()
-        if not agency:
-            auth_ns.abort(404, "Approved agency not found")
-
-        if agency.email != data['email']:
-            auth_ns.abort(400, "Email does not match agency registration")
-
-        if User.query.filter_by(email=data['email']).first():
-            auth_ns.abort(409, "Email already registered")
-
-        user = User(email=data['email'], role='agency', agency_id=agency.agency_id)
-        user.set_password(data['password'])
-        db.session.add(user)
-        db.session.commit()
-
-        access_token = create_access_token(
-            identity=user.id,
-            additional_claims={"sub": str(user.id), "role": user.role}
-        )
-        return {"access_token": access_token, "role": user.role}, 201
+        return AuthService.claim_agency(agency_id)
@@ -6,6 +6,7 @@ Provides endpoints for authenticated client operations
 from flask import request
 from flask_restx import Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func
 from app.models import Review, User
 from app.extensions import db, api
 
@@ -33,16 +34,19 @@ class ClientMyReviews(Resource):
             client_ns.abort(404, "User not found")
 
         # Query reviews for this client (owned or by email)
-        query = Review.query.filter(
-            (Review.client_id == client_id) |
-            ((Review.client_id.is_(None)) & (Review.customer_email == user.email))
+        owned = (Review.client_id == client_id) | (
+            (Review.client_id.is_(None)) & (Review.customer_email == user.email)
         )
-        total = query.count()
-        reviews = query.offset((page-1)*limit).limit(limit).all()
+        # Page and total in one round-trip via COUNT(*) OVER (), columns only
+        rows = Review.list_query().add_columns(func.count().over().label('total')).filter(owned).order_by(
+            Review.created_at.desc(), Review.id.desc()
+        ).offset((page-1)*limit).limit(limit).all()
+        # Past the last page no row carries the total; count separately then
+        total = rows[0].total if rows else (Review.query.filter(owned).count() if page > 1 else 0)
         pages = (total + limit - 1) // limit
 
         return {
-            'data': [r.to_dict() for r in reviews],
+            'data': [Review.row_to_dict(row) for row in rows],
             'total': total,
             'page': page,
             'pages': pages
@@ -1,4 +1,5 @@
-from flask import Blueprint, jsonify, redirect, url_for
+import orjson
+from flask import Blueprint, Response, redirect, url_for
 from flask_smorest import Blueprint as SmorestBlueprint
 from marshmallow import Schema, fields
 
@@ -13,26 +14,35 @@ class MessageSchema(Schema):
     docs_url = fields.Str()
     endpoints = fields.Dict()
 
+# Static payloads, serialized once at import in app.json's compact form
+# (sorted keys, trailing newline)
+_HOMEPAGE_BYTES = orjson.dumps({
+    'status': 'success',
+    'message': 'Welcome to Nexaway API - Tunisian Diaspora Trust Platform',
+    'version': '1.0.0',
+    'docs_url': '/docs',
+    'swagger_url': '/swagger',
+    'redoc_url': '/redoc',
+    'openapi_json': '/openapi.json',
+    'endpoints': {
+        'agencies': '/v1/agencies',
+        'auth': '/v1/auth',
+        'reviews': '/v1/reviews',
+        'offers': '/v1/offers',
+        'admin': '/v1/admin',
+        'external': '/external'
+    }
+}, option=orjson.OPT_SORT_KEYS) + b'\n'
+
+_HEALTH_BYTES = orjson.dumps({
+    'status': 'healthy',
+    'service': 'nexaway-api'
+}, option=orjson.OPT_SORT_KEYS) + b'\n'
+
 @home_bp.route('/', methods=['GET'])
 def homepage():
     """API homepage with documentation links"""
-    return jsonify({
-        'status': 'success',
-        'message': 'Welcome to Nexaway API - Tunisian Diaspora Trust Platform',
-        'version': '1.0.0',
-        'docs_url': '/docs',
-        'swagger_url': '/swagger',
-        'redoc_url': '/redoc',
-        'openapi_json': '/openapi.json',
-        'endpoints': {
-            'agencies': '/v1/agencies',
-            'auth': '/v1/auth',
-            'reviews': '/v1/reviews',
-            'offers': '/v1/offers',
-            'admin': '/v1/admin',
-            'external': '/external'
-        }
-    })
+    return Response(_HOMEPAGE_BYTES, mimetype='application/json')
 
 @home_bp.route('/swagger', methods=['GET'])
 def swagger_redirect():
@@ -42,7 +52,6 @@ def swagger_redirect():
 @home_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for monitoring"""
-    return jsonify({
-        'status': 'healthy',
-        'service': 'nexaway-api'
-    }), 200
+    response = Response(_HEALTH_BYTES, status=200, mimetype='application/json')
+    response.headers['Cache-Control'] = 'public, max-age=10'
+    return response
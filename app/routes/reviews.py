@@ -1,7 +1,8 @@
-import uuid
 import re
+from secrets import token_hex
 from flask import Blueprint, request, abort, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy.orm import selectinload
 from app.models import Review, Agency, User
 from app.extensions import db
 from app.decorators import role_required
@@ -52,7 +53,7 @@ def create_review():
         return {"error": "Rating must be between 1 and 5"}, 400
 
     # Generate review ID
-    review_id = f"R-{uuid.uuid4().hex[:8].upper()}"
+    review_id = f"R-{token_hex(4).upper()}"
 
     # Create review
     review = Review(
@@ -92,7 +93,7 @@ def get_reviews():
         query = query.filter_by(status=status)
 
     total = query.count()
-    reviews = query.offset((page-1)*limit).limit(limit).all()
+    reviews = query.options(selectinload(Review.agency)).offset((page-1)*limit).limit(limit).all()
 
     return {
         'data': [r.to_dict() for r in reviews],
@@ -157,7 +158,7 @@ def get_client_reviews():
         ((Review.client_id.is_(None)) & (Review.customer_email == user.email))
     )
     total = query.count()
-    reviews = query.offset((page-1)*limit).limit(limit).all()
+    reviews = query.options(selectinload(Review.agency)).offset((page-1)*limit).limit(limit).all()
 
     # Format response as specified
     result = []
@@ -3,12 +3,13 @@ Review API Routes using Flask-RESTX
 Provides endpoints for submitting, viewing, and managing reviews
 """
 
-import uuid
 import re
+from secrets import token_hex
 from flask import request
 from flask_restx import Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 from app.models import Review, Agency, User
 from app.extensions import db, api
 from app.decorators import role_required
@@ -60,7 +61,8 @@ class ReviewList(Resource):
             query = query.filter_by(status=status)
 
         total = query.count()
-        reviews = query.offset((page-1)*limit).limit(limit).all()
+        # to_dict() reads review.agency: load the page's agencies in one IN query
+        reviews = query.options(selectinload(Review.agency)).offset((page-1)*limit).limit(limit).all()
         pages = (total + limit - 1) // limit
 
         return {
@@ -109,7 +111,7 @@ class ReviewList(Resource):
         if not (1 <= data.get('rating', 0) <= 5):
             reviews_ns.abort(400, "Rating must be between 1 and 5")
 
-        review_id = f"R-{uuid.uuid4().hex[:8].upper()}"
+        review_id = f"R-{token_hex(4).upper()}"
         review = Review(
             review_id=review_id,
             agency_id=agency.agency_id,
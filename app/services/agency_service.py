@@ -2,25 +2,71 @@ import os
 import csv
 import re
 import shutil
+from collections import Counter, defaultdict
 from datetime import datetime
 from flask import abort
 
+# Parsed CSV shared by all requests in this process, keyed on (mtime_ns, size).
+# 'sorted' is the trust-ordered view and 'by_gov' buckets it by lowercased
+# governorate; both are built on first use after each reload.
+_CSV_CACHE = {'key': None, 'items': [], 'by_tax_id': {}, 'governorates': Counter(), 'sum_trust': 0,
+              'sorted': None, 'by_gov': None}
+
+
 class AgencyService:
     CSV_PATH = 'data/tunisia_agencies_real_dataset.csv'
 
-    TUNISIAN_GOVERNORATES = [
+    TUNISIAN_GOVERNORATES = frozenset({
         'Tunis', 'Ariana', 'Ben Arous', 'Manouba', 'Nabeul', 'Zaghouan', 'Bizerte',
         'Beja', 'Jendouba', 'Kef', 'Siliana', 'Sousse', 'Monastir', 'Mahdia', 'Sfax',
         'Kairouan', 'Kasserine', 'Sidi Bouzid', 'Gabes', 'Medenine', 'Tataouine',
         'Gafsa', 'Tozeur', 'Kebili'
-    ]
+    })
+
+    # Trust scoring lookups, built once instead of on every call
+    BLOCKED_PHONE_PREFIXES = frozenset({'1', '6', '8', '0'})
+    SUSPICIOUS_EMAIL_WORDS = ('free', 'temp', 'spam', 'fake')
+    TRAVEL_KEYWORDS = ('VOYAGES', 'TRAVEL', 'BOOKING', 'AGENCE', 'AGENCY', 'TOURS')
+    # Keyword/format checks compiled once: one regex scan instead of N substring tests
+    TRAVEL_KEYWORDS_RE = re.compile('|'.join(TRAVEL_KEYWORDS))
+    SUSPICIOUS_EMAIL_RE = re.compile('|'.join(SUSPICIOUS_EMAIL_WORDS), re.IGNORECASE)
+    SCORING_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-z]{2,}$')
+    FORM_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+    PHONE_SEPARATORS_RE = re.compile(r'[\s\-]')
+    TOP_GOVERNORATES = frozenset({'TUNIS', 'ARINA', 'BEN AROUS', 'SOUSSE', 'SFAX'})  # Top 5
 
     @staticmethod
     def load_csv():
-        """Load all agencies from CSV as List[dict]"""
-        if not os.path.exists(AgencyService.CSV_PATH):
+        """
+        Load all agencies from CSV as List[dict].
+
+        The parse is cached per process and redone only when the file's
+        mtime/size change; rows are shared, so treat them as read-only.
+        """
+        try:
+            st = os.stat(AgencyService.CSV_PATH)
+        except FileNotFoundError:
+            _CSV_CACHE.update({'key': None, 'items': [], 'by_tax_id': {},
+                               'governorates': Counter(), 'sum_trust': 0,
+                               'sorted': None, 'by_gov': None})
             return []
 
+        key = (st.st_mtime_ns, st.st_size)
+        if _CSV_CACHE['key'] != key:
+            items = AgencyService._parse_csv()
+            _CSV_CACHE.update({
+                'key': key,
+                'items': items,
+                'by_tax_id': {a['tax_id']: a for a in items},
+                'governorates': Counter(a['governorate'] for a in items),
+                'sum_trust': sum(a['trust_score'] for a in items),
+                'sorted': None,
+                'by_gov': None,
+            })
+        return list(_CSV_CACHE['items'])
+
+    @staticmethod
+    def _parse_csv():
         agencies = []
         with open(AgencyService.CSV_PATH, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
@@ -65,17 +111,18 @@ class AgencyService:
                     'analysis': agency['analysis'],
                     'last_verified': agency['last_verified']
                 })
+        _CSV_CACHE['key'] = None
 
     @staticmethod
     def validate_phone(phone):
-        phone = re.sub(r'[\s\-]', '', phone)
+        phone = AgencyService.PHONE_SEPARATORS_RE.sub('', phone)
         if not phone.startswith('+216') or len(phone) != 12:
             return False, "Format +216XXXXXXXX"
         digits = phone[4:]
         if len(digits) != 8 or not digits.isdigit():
             return False, "8 digits only"
         prefix = digits[0]
-        if prefix in ['1','6','8','0']:
+        if prefix in AgencyService.BLOCKED_PHONE_PREFIXES:
             return False, "Blocked prefix"
         return True, "OK"
 
@@ -96,8 +143,8 @@ class AgencyService:
 
         # EMAIL suspicious
         email = agency.get('email', '')
-        if email and re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-z]{2,}$', email):
-            if any(s in email.lower() for s in ['free','temp','spam','fake']):
+        if email and AgencyService.SCORING_EMAIL_RE.match(email):
+            if AgencyService.SUSPICIOUS_EMAIL_RE.search(email):
                 score -= 20; reasons.append("Suspicious email (-20)")
             elif email.endswith('.tn'):
                 score += 10; reasons.append(".tn email (+10)")
@@ -108,8 +155,7 @@ class AgencyService:
 
         # COMPANY NAME - TRAVEL KEYWORDS + SARL
         name = agency.get('company_name', '').upper()
-        travel_keywords = ['VOYAGES', 'TRAVEL', 'BOOKING', 'AGENCE', 'AGENCY', 'TOURS']
-        if any(kw in name for kw in travel_keywords):
+        if AgencyService.TRAVEL_KEYWORDS_RE.search(name):
             score += 20
             reasons.append("Travel keyword (+20)")
         if 'SARL' in name:
@@ -119,8 +165,7 @@ class AgencyService:
             score -= 20; reasons.append("Name too short (-20)")
 
         # GOVERNORATE
-        govs = ['TUNIS','ARINA','BEN AROUS','SOUSSE','SFAX']  # Top 5
-        if agency.get('governorate') in govs:
+        if agency.get('governorate') in AgencyService.TOP_GOVERNORATES:
             score += 15
             reasons.append("Valid gov (+15)")
 
@@ -139,8 +184,7 @@ class AgencyService:
     @staticmethod
     def is_duplicate(tax_id):
         """Check if tax_id already exists"""
-        agencies = AgencyService.load_csv()
-        return any(agency['tax_id'] == tax_id for agency in agencies)
+        return AgencyService.get_agency_by_tax_id(tax_id) is not None
 
     @staticmethod
     def validate_agency_data(agency_data):
@@ -157,7 +201,7 @@ class AgencyService:
 
         # Validate email format
         email = agency_data.get('email')
-        if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
+        if not AgencyService.FORM_EMAIL_RE.match(email):
             abort(400, "Invalid email format")
 
         # Validate phone
@@ -254,14 +298,40 @@ class AgencyService:
     @staticmethod
     def get_agency_by_tax_id(tax_id):
         """Get agency by tax_id"""
-        agencies = AgencyService.load_csv()
-        return next((a for a in agencies if a['tax_id'] == tax_id), None)
+        AgencyService.load_csv()  # refresh the cache if the file changed
+        return _CSV_CACHE['by_tax_id'].get(tax_id)
+
+    @staticmethod
+    def get_csv_stats():
+        """Governorate counts, total and average trust, precomputed at CSV load"""
+        AgencyService.load_csv()  # refresh the cache if the file changed
+        governorates = _CSV_CACHE['governorates']
+        total = len(_CSV_CACHE['items'])
+        return {
+            'stats': dict(governorates),
+            'total': total,
+            'avg_trust': round(_CSV_CACHE['sum_trust'] / total, 1) if total > 0 else 0,
+            'top_governorate': governorates.most_common(1)[0] if governorates else ('None', 0),
+        }
 
     @staticmethod
     def get_agencies_sorted_by_trust():
-        """Get all agencies sorted by trust_score DESC"""
+        """Get all agencies sorted by trust_score DESC (sorted once per CSV load)"""
         agencies = AgencyService.load_csv()
-        return sorted(agencies, key=lambda x: x['trust_score'], reverse=True)
+        if _CSV_CACHE['sorted'] is None:
+            _CSV_CACHE['sorted'] = sorted(agencies, key=lambda x: x['trust_score'], reverse=True)
+        return list(_CSV_CACHE['sorted'])
+
+    @staticmethod
+    def get_agencies_by_governorate(governorate):
+        """Agencies in a governorate (case-insensitive), sorted by trust_score DESC"""
+        agencies = AgencyService.get_agencies_sorted_by_trust()
+        if _CSV_CACHE['by_gov'] is None:
+            by_gov = defaultdict(list)
+            for agency in agencies:
+                by_gov[agency['governorate'].lower()].append(agency)
+            _CSV_CACHE['by_gov'] = dict(by_gov)
+        return list(_CSV_CACHE['by_gov'].get(governorate.lower(), ()))
 
     @staticmethod
     def validate_rne_format(rne):
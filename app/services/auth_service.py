@@ -0,0 +1,92 @@
+from flask import request
+from flask_jwt_extended import create_access_token
+from sqlalchemy import exists
+
+from app.extensions import db
+from app.models import User, Agency
+
+
+class AuthError(Exception):
+    """Login/registration failure; each route module renders it in its own format"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class AuthService:
+    """Login, client registration and agency claims shared by auth.py and auth_restx.py"""
+
+    @staticmethod
+    def token_response(user, status=200):
+        """JWT for user plus its role, as returned by every login/register endpoint"""
+        access_token = create_access_token(
+            identity=user.id,
+            additional_claims={"sub": str(user.id), "role": user.role}
+        )
+        return {"access_token": access_token, "role": user.role}, status
+
+    @staticmethod
+    def credentials():
+        """(email, password) from the JSON body - AuthError 400 unless both are strings"""
+        data = request.get_json()
+        try:
+            email, password = data['email'], data['password']
+        except (KeyError, TypeError):
+            email = password = None
+        if not isinstance(email, str) or not isinstance(password, str):
+            raise AuthError("Email and password required", 400)
+        return email, password
+
+    @staticmethod
+    def login(role):
+        """Email/password login for the given role"""
+        email, password = AuthService.credentials()
+
+        user = User.query.filter_by(email=email, role=role).first()
+        if not user or not user.check_password(password):
+            raise AuthError("Invalid credentials", 401)
+
+        return AuthService.token_response(user)
+
+    @staticmethod
+    def register_client():
+        """Create a client account and log it in"""
+        email, password = AuthService.credentials()
+
+        if db.session.query(exists().where(User.email == email)).scalar():
+            raise AuthError("Email already registered", 409)
+
+        user = User(email=email, role='client')
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+
+        return AuthService.token_response(user, 201)
+
+    @staticmethod
+    def claim_agency(agency_id):
+        """Create the agency account of an approved agency whose registered email matches"""
+        email, password = AuthService.credentials()
+
+        # Agency plus "is its email already a user" in one round-trip
+        row = db.session.query(Agency, exists().where(User.email == Agency.email)).filter(
+            Agency.agency_id == agency_id, Agency.status == 'approved'
+        ).first()
+        if not row:
+            raise AuthError("Approved agency not found", 404)
+        agency, email_taken = row
+
+        if agency.email != email:
+            raise AuthError("Email does not match agency registration", 400)
+
+        if email_taken:
+            raise AuthError("Email already registered", 409)
+
+        user = User(email=email, role='agency', agency_id=agency.agency_id)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+
+        return AuthService.token_response(user, 201)
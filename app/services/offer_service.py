@@ -1,6 +1,7 @@
-import uuid
 from datetime import datetime, date
+from secrets import token_hex
 from flask import abort
+from sqlalchemy.orm import selectinload
 from app.extensions import db
 from app.models import Offer
 from app.services.agency_service import AgencyService
@@ -10,7 +11,8 @@ class OfferService:
     @staticmethod
     def get_offers(filters=None, page=1, limit=10, sort='price_asc'):
         """Get offers with filtering, pagination, and sorting"""
-        query = Offer.query
+        # to_dict() reads offer.agency: load the page's agencies in one IN query
+        query = Offer.query.options(selectinload(Offer.agency))
 
         # Apply filters
         if filters:
@@ -56,8 +58,13 @@ class OfferService:
         if not agency or agency['trust_score'] < 40:
             abort(400, f"Agency invalid (score: {agency.get('trust_score',0)})")
 
+        # tags is a JSON array; accept the legacy comma-separated form too
+        tags = offer_data.get('tags')
+        if isinstance(tags, str):
+            tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+
         # Generate offer_id
-        offer_id = f"O-{uuid.uuid4()[:6].upper()}"
+        offer_id = f"O-{token_hex(3).upper()}"
 
         offer = Offer(
             offer_id=offer_id,
@@ -75,7 +82,7 @@ class OfferService:
             pilgrimage_type=offer_data.get('pilgrimage_type'),
             domestic=offer_data.get('domestic', False),
             capacity=offer_data.get('capacity'),
-            tags=offer_data.get('tags'),
+            tags=tags,
             description=offer_data.get('description')
         )
 
@@ -134,7 +141,7 @@ class OfferService:
                 "date_to": "2026-02-20",
                 "agency_id": "TUN-123456",
                 "capacity": 50,
-                "tags": '["vip", "luxury"]'
+                "tags": ["vip", "luxury"]
             },
             {
                 "offer_id": "O-000002",
@@ -147,7 +154,7 @@ class OfferService:
                 "price": 450,
                 "agency_id": "TUN-789012",
                 "capacity": 100,
-                "tags": '["business"]'
+                "tags": ["business"]
             },
             {
                 "offer_id": "O-000003",
@@ -159,7 +166,7 @@ class OfferService:
                 "currency": "TND",
                 "agency_id": "TUN-345678",
                 "capacity": 200,
-                "tags": '["family"]'
+                "tags": ["family"]
             }
         ]
 
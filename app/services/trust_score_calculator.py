@@ -11,7 +11,13 @@ Evaluates agencies based on:
 """
 
 import re
-from datetime import timedelta
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, event, func, inspect
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Agency, AgencyTrust, Review, weighted_trust_score
 
 class TrustScoreCalculator:
     """
@@ -143,21 +149,8 @@ class TrustScoreCalculator:
             reasons.append("No approved reviews")
             return score_change, reasons
         
-        # Average rating
         ratings = [float(r.rating) for r in approved if hasattr(r, 'rating')]
-        if ratings:
-            avg_rating = sum(ratings) / len(ratings)
-            
-            if avg_rating >= 4.0:
-                score_change += 20
-                reasons.append(f"High ratings ({avg_rating:.1f}★) (+20)")
-            elif avg_rating >= 3.0:
-                score_change += 10
-                reasons.append(f"Good ratings ({avg_rating:.1f}★) (+10)")
-            else:
-                score_change -= 15
-                reasons.append(f"Low ratings ({avg_rating:.1f}★) (-15)")
-        
+
         # Fast replies (within 24 hours)
         fast_replies = 0
         for r in approved:
@@ -169,16 +162,44 @@ class TrustScoreCalculator:
                 except:
                     pass
         
-        if fast_replies > 0:
-            score_change += 10
-            reasons.append(f"Fast replies ({fast_replies}) (+10)")
-        
         # Resolutions (re-rating >= 4)
         resolutions = 0
         for r in approved:
             if hasattr(r, 're_rating') and r.re_rating and r.re_rating >= 4:
                 resolutions += 1
         
+        return TrustScoreCalculator.calculate_from_counts(len(ratings), sum(ratings), fast_replies, resolutions)
+    
+    @staticmethod
+    def calculate_from_counts(rated, rating_sum, fast_replies, resolutions):
+        """
+        Review score from pre-aggregated approved reviews:
+        number of ratings, their sum, fast replies and resolutions.
+        Same rules as calculate_from_reviews.
+        
+        Returns: (score_change, reasons_list)
+        """
+        score_change = 0
+        reasons = []
+        
+        # Average rating
+        if rated:
+            avg_rating = float(rating_sum) / rated
+            
+            if avg_rating >= 4.0:
+                score_change += 20
+                reasons.append(f"High ratings ({avg_rating:.1f}★) (+20)")
+            elif avg_rating >= 3.0:
+                score_change += 10
+                reasons.append(f"Good ratings ({avg_rating:.1f}★) (+10)")
+            else:
+                score_change -= 15
+                reasons.append(f"Low ratings ({avg_rating:.1f}★) (-15)")
+        
+        if fast_replies > 0:
+            score_change += 10
+            reasons.append(f"Fast replies ({fast_replies}) (+10)")
+        
         if resolutions > 0:
             score_change += 15
             reasons.append(f"Good resolutions ({resolutions}) (+15)")
@@ -203,6 +224,156 @@ class TrustScoreCalculator:
             - reasons: list of evaluation reasons
             - details: dict with component scores
         """
+        score, reasons, details = TrustScoreCalculator._evaluate_profile(agency)
+        
+        # Reviews analysis
+        if reviews:
+            review_score, review_reasons = TrustScoreCalculator.calculate_from_reviews(reviews)
+            score += review_score
+            reasons.extend(review_reasons)
+            details['reviews'] = {'score': review_score, 'count': len(reviews)}
+        else:
+            details['reviews'] = {'score': 0, 'count': 0}
+        
+        return TrustScoreCalculator._result(score, reasons, details)
+
+    @staticmethod
+    def review_aggregates_query(session=None):
+        """
+        Approved review aggregates per agency as one GROUP BY query:
+        agency_id, total, rated, rating_sum, fast_replies, resolutions.
+        Use .subquery() to outer-join it onto Agency.
+        """
+        if db.engine.dialect.name == 'sqlite':
+            # SQLite stores DATETIME as text; compare on the julian day scale
+            within = func.julianday(Review.reply_at) - func.julianday(Review.created_at) < 1
+        else:
+            within = Review.reply_at - Review.created_at < timedelta(hours=24)
+        fast = and_(Review.reply.isnot(None), Review.reply != '', within)
+        return (session or db.session).query(
+            Review.agency_id,
+            func.count(Review.id).label('total'),
+            func.count(Review.rating).label('rated'),
+            func.sum(Review.rating).label('rating_sum'),
+            func.sum(case((fast, 1), else_=0)).label('fast_replies'),
+            func.sum(case((Review.re_rating >= 4, 1), else_=0)).label('resolutions'),
+        ).filter(Review.status == 'approved').group_by(Review.agency_id)
+
+    @staticmethod
+    def calculate_from_aggregates(agency, total, rated, rating_sum, fast_replies, resolutions):
+        """
+        calculate_trust_score from review_aggregates_query columns instead of
+        Review objects; None (agency without approved reviews) counts as 0.
+        """
+        score, reasons, details = TrustScoreCalculator._evaluate_profile(agency)
+        review_score = 0
+        if total:
+            review_score, review_reasons = TrustScoreCalculator.calculate_from_counts(
+                rated or 0, rating_sum or 0, fast_replies or 0, resolutions or 0
+            )
+            score += review_score
+            reasons.extend(review_reasons)
+        details['reviews'] = {'score': review_score, 'count': total or 0}
+        return TrustScoreCalculator._result(score, reasons, details)
+
+    @staticmethod
+    def calculate_trust_scores_bulk(agencies):
+        """
+        calculate_trust_score for many Agency models with a single aggregate query.
+
+        Returns: {agency.id: result dict}
+        """
+        aggregates = {}
+        agency_ids = [a.agency_id for a in agencies if a.agency_id]
+        if agency_ids:
+            query = TrustScoreCalculator.review_aggregates_query().filter(Review.agency_id.in_(agency_ids))
+            aggregates = {agency_id: counts for agency_id, *counts in query}
+
+        return {
+            agency.id: TrustScoreCalculator.calculate_from_aggregates(
+                agency, *aggregates.get(agency.agency_id, (0, 0, 0, 0, 0))
+            )
+            for agency in agencies
+        }
+
+    @staticmethod
+    def refresh_stored(agency_ids=None, session=None):
+        """
+        Upsert agency_trust rows for the given agency_ids (all when None)
+        without committing: the weighted Agency.trust_score and this
+        calculator's result, from one aggregate query. Returns row count.
+        Only Core statements are emitted, so it is safe from flush events.
+        """
+        session = session or db.session
+        recent_cutoff = datetime.utcnow() - timedelta(days=30)
+        aggregates = TrustScoreCalculator.review_aggregates_query(session).add_columns(
+            func.sum(case((Review.created_at >= recent_cutoff, 1), else_=0)).label('recent'),
+            func.sum(case((Agency._replied_fast_expr(), 1), else_=0)).label('replied_fast'),
+        )
+        if agency_ids is not None:
+            # Filter inside the GROUP BY so only these agencies' reviews are scanned
+            aggregates = aggregates.filter(Review.agency_id.in_(agency_ids))
+        aggregates = aggregates.subquery()
+        query = session.query(
+            Agency.agency_id, Agency.status, Agency.phone, Agency.email, Agency.tax_id, Agency.official_name,
+            aggregates.c.total, aggregates.c.rated, aggregates.c.rating_sum,
+            aggregates.c.fast_replies, aggregates.c.resolutions,
+            aggregates.c.recent, aggregates.c.replied_fast
+        ).outerjoin(aggregates, Agency.agency_id == aggregates.c.agency_id).filter(Agency.agency_id.isnot(None))
+        if agency_ids is not None:
+            query = query.filter(Agency.agency_id.in_(agency_ids))
+
+        now = datetime.utcnow()
+        rows = []
+        for agency in query:
+            result = TrustScoreCalculator.calculate_from_aggregates(agency, *agency[6:11])
+            rows.append({
+                'agency_id': agency.agency_id,
+                'score': weighted_trust_score(
+                    agency.status, agency.total or 0, agency.recent or 0,
+                    agency.rating_sum or 0, agency.replied_fast or 0
+                ),
+                'rules_score': result['score'],
+                'reviews_count': result['details']['reviews']['count'],
+                'evaluation_reasons': result['reasons'],
+                'updated_at': now,
+            })
+        if rows:
+            AgencyTrust.upsert(rows, session=session)
+        return len(rows)
+
+    @staticmethod
+    def stored_trust_scores(agencies):
+        """
+        Calculator results for Agency models read from their agency_trust
+        rows; agencies without a stored result are calculated in bulk.
+
+        Returns: {agency.id: {'score', 'reviews_count', 'reasons'}}
+        """
+        results = {}
+        missing = []
+        for agency in agencies:
+            row = agency.trust_row
+            if row is not None and row.rules_score is not None:
+                results[agency.id] = {
+                    'score': row.rules_score,
+                    'reviews_count': row.reviews_count or 0,
+                    'reasons': row.evaluation_reasons or [],
+                }
+            else:
+                missing.append(agency)
+
+        for agency_pk, result in TrustScoreCalculator.calculate_trust_scores_bulk(missing).items():
+            results[agency_pk] = {
+                'score': result['score'],
+                'reviews_count': result['details']['reviews']['count'],
+                'reasons': result['reasons'],
+            }
+        return results
+
+    @staticmethod
+    def _evaluate_profile(agency):
+        """Base score plus phone, email, RNE and official name checks: (score, reasons, details)"""
         score = 50  # Base score
         reasons = []
         details = {}
@@ -245,16 +416,11 @@ class TrustScoreCalculator:
             reasons.append(f"Official name verified (+{name_score})")
         details['official_name'] = {'has_name': has_name, 'score': name_score}
         
-        # Reviews analysis
-        if reviews:
-            review_score, review_reasons = TrustScoreCalculator.calculate_from_reviews(reviews)
-            score += review_score
-            reasons.extend(review_reasons)
-            details['reviews'] = {'score': review_score, 'count': len(reviews)}
-        else:
-            details['reviews'] = {'score': 0, 'count': 0}
-        
-        # Normalize score (0-100)
+        return score, reasons, details
+
+    @staticmethod
+    def _result(score, reasons, details):
+        """Clamp to 0-100 and build the calculate_trust_score result dict"""
         final_score = min(100, max(0, score))
         
         return {
@@ -263,3 +429,26 @@ class TrustScoreCalculator:
             'details': details,
             'base_score': 50
         }
+
+
+def _affects_trust(obj):
+    """Agencies always; reviews only when approved before or after the flush"""
+    if isinstance(obj, Agency):
+        return True
+    if not isinstance(obj, Review):
+        return False
+    # History is still populated in after_flush; pending/rejected-only
+    # reviews never reach the approved aggregates
+    return obj.status == 'approved' or 'approved' in inspect(obj).attrs.status.history.deleted
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_stored_after_flush(session, flush_context):
+    """Keep agency_trust current when approved reviews or agencies are written"""
+    agency_ids = {
+        obj.agency_id
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if _affects_trust(obj) and obj.agency_id
+    }
+    if agency_ids:
+        TrustScoreCalculator.refresh_stored(agency_ids, session=session)
@@ -1,7 +1,9 @@
 import csv
+from itertools import islice
 from app import create_app, db
 from app.models import Agency, Review
 from app.services.offer_service import OfferService
+from app.services.trust_score_calculator import TrustScoreCalculator
 
 # Create app context
 app = create_app()
@@ -10,29 +12,102 @@ app.app_context().push()
 # Create tables
 db.create_all()
 
+AGENCIES_CSV = 'data/tunisia_agencies_real_dataset.csv'
+
+
+def copy_agencies_postgres(path):
+    """Postgres fast path: COPY the CSV into a staging table, then one INSERT ... SELECT"""
+    raw = db.engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        with open(path, 'r', encoding='utf-8') as f:
+            header = next(csv.reader(f))
+            f.seek(0)
+            columns = ', '.join(f'"{name}" TEXT' for name in header)
+            cur.execute(f"CREATE TEMP TABLE agencies_csv ({columns}) ON COMMIT DROP")
+            cur.copy_expert("COPY agencies_csv FROM STDIN WITH CSV HEADER", f)
+        cur.execute("""
+            INSERT INTO agencies (tax_id, company_name, official_name, governorate,
+                                  email, phone, verification_status, status, source,
+                                  created_at, updated_at)
+            SELECT DISTINCT ON (tax_id) tax_id, company_name, COALESCE(official_name, ''),
+                   COALESCE(governorate, ''), COALESCE(email, ''), COALESCE(phone, ''),
+                   'pending', 'active', 'csv', now(), now()
+            FROM agencies_csv
+            WHERE tax_id IS NOT NULL
+            ON CONFLICT (tax_id) DO NOTHING
+        """)
+        count = cur.rowcount
+        raw.commit()
+    finally:
+        raw.close()
+    return count
+
+
+def chunks(iterable, size):
+    """Yield lists of up to `size` items without materializing the input"""
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_new_agencies(path, existing):
+    """Stream agency mappings from the CSV, skipping known tax_ids"""
+    with open(path, 'r', encoding='utf-8') as f:
+        # Positional rows + a header index instead of a dict per row
+        reader = csv.reader(f)
+        idx = {name: i for i, name in enumerate(next(reader))}
+        tax_i, name_i = idx['tax_id'], idx['company_name']
+        optional = [(key, idx.get(key)) for key in
+                    ('official_name', 'governorate', 'email', 'phone')]
+
+        for row in reader:
+            tax_id = row[tax_i]
+            # Skip if tax_id already exists
+            if tax_id in existing:
+                continue
+            existing.add(tax_id)
+
+            mapping = {
+                'tax_id': tax_id,
+                'company_name': row[name_i],
+                'status': 'active',
+                'source': 'csv'
+            }
+            for key, i in optional:
+                mapping[key] = row[i] if i is not None and i < len(row) else ''
+            yield mapping
+
+
+def load_agencies_bulk(path):
+    """Portable path: skip known tax_ids and bulk insert plain mappings"""
+    # One query for existing tax_ids instead of one lookup per CSV row
+    existing = {tax_id for (tax_id,) in db.session.query(Agency.tax_id)}
+    count = 0
+    for batch in chunks(iter_new_agencies(path, existing), app.config['SEED_BATCH_SIZE']):
+        # Plain dicts skip the unit-of-work bookkeeping of per-row session.add()
+        db.session.bulk_insert_mappings(Agency, batch)
+        db.session.flush()
+        count += len(batch)
+    # Single transaction for the whole file
+    db.session.commit()
+    return count
+
+
 # Load agencies from CSV
 print("Loading agencies from CSV...")
-with open('data/tunisia_agencies_real_dataset.csv', 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        # Skip if tax_id already exists
-        if Agency.query.filter_by(tax_id=row['tax_id']).first():
-            continue
-
-        agency = Agency(
-            tax_id=row['tax_id'],
-            company_name=row['company_name'],
-            official_name=row.get('official_name', ''),
-            governorate=row.get('governorate', ''),
-            email=row.get('email', ''),
-            phone=row.get('phone', ''),
-            status='active',
-            source='csv'
-        )
-        db.session.add(agency)
+if db.engine.dialect.name == 'postgresql':
+    loaded = copy_agencies_postgres(AGENCIES_CSV)
+else:
+    loaded = load_agencies_bulk(AGENCIES_CSV)
+print(f"✅ Agencies loaded! ({loaded} new)")
 
+# Both load paths bypass the ORM flush hook that maintains agency_trust
+TrustScoreCalculator.refresh_stored()
 db.session.commit()
-print("✅ Agencies loaded!")
 
 # Seed sample offers
 OfferService.seed_sample_data()
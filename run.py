@@ -1,6 +1,7 @@
 from app import create_app
+from app.config import DevelopmentConfig
 
-app = create_app()
+app = create_app(DevelopmentConfig)
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8000)
@@ -1,7 +1,8 @@
 import os
 from app import create_app
+from app.config import DevelopmentConfig
 
-app = create_app()
+app = create_app(DevelopmentConfig)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8000))
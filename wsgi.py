@@ -3,23 +3,17 @@ WSGI entry point for Gunicorn
 Ensures proper application creation and configuration
 """
 import os
-from app import create_app, db
+from app import create_app
 
-# Create Flask app instance
-app = create_app()
+from app.config import Config, ProductionConfig
 
-# Set production configuration
+# Create Flask app instance with the production configuration when requested
 if os.environ.get('FLASK_ENV') == 'production':
-    from app.config import ProductionConfig
-    app.config.from_object(ProductionConfig)
+    app = create_app(ProductionConfig)
+else:
+    app = create_app(Config)
 
-# Initialize database tables on startup
-with app.app_context():
-    try:
-        db.create_all()
-        print("[✓] Database tables initialized")
-    except Exception as e:
-        print(f"[!] Database initialization error: {str(e)}")
+# Missing tables are created inside create_app() unless AUTO_CREATE_TABLES=false
 
 if __name__ == '__main__':
     # Development only